@@ -1,4 +1,7 @@
 from .armine import ARM
 from .classifier import ARMClassifier
+from .predictor import Predictor, AtomicPredictor
+from .ruletable import RuleTable
 
-__all__ = ['ARM', 'ARMClassifier']
+__all__ = ['ARM', 'ARMClassifier', 'Predictor', 'AtomicPredictor',
+           'RuleTable']
@@ -1,15 +1,20 @@
+import csv
+from heapq import heappush, heappushpop
 from io import open
-from itertools import chain
-try:
-    # Python 2
-    from itertools import ifilterfalse as filterfalse
-except ImportError:
-    # Pyhton 3
-    from itertools import filterfalse
+from itertools import chain, groupby
+from math import ceil
+from operator import itemgetter
+from timeit import default_timer
 from beautifultable import BeautifulTable
 
-from .utils import get_subsets
+from .utils import (popcount, bitset_from_indices, indices_from_bitset,
+                    LRUCache, BitsetCounter, CacheInfo, LearnStats, item_key)
 from .rule import AssociationRule
+from .ruletable import RuleTable
+from .mining import fpgrowth, eclat
+from .model import ModelInfo, CompiledModel, save_model, MODEL_ARM
+from .matrix import get_shape, onehot_bitsets, categorical_bitsets
+from .parallel import CountingPool, get_n_jobs
 
 
 class ARM(object):
@@ -18,10 +23,29 @@ class ARM(object):
     This class provides methods to generate a set of Association rules
     from a transactional dataset.
     """
+    _ALGORITHMS = {'apriori': '_apriori', 'fpgrowth': '_fpgrowth',
+                   'eclat': '_eclat', 'declat': '_declat'}
+    _ITEMSETS = ('all', 'closed', 'maximal')
+    # Smallest number of uncached candidates worth sending to the workers.
+    _PARALLEL_MIN_CANDIDATES = 512
+    _MODEL_KIND = MODEL_ARM
+    # Whether the count of an itemset is its number of transactions, as
+    # found by the mining engines.
+    _PLAIN_COUNTS = True
+
     def __init__(self):
         self._dataset = []
         self._rules = []
-        self._itemcounts = {}
+        self._rule_table = None
+        self._itemcounts = LRUCache(maxsize=100000)
+        self._items = []
+        self._item_ids = {}
+        self._item_bitsets = []
+        self._full_bitset = 0
+        self._datasize = 0
+        self._csv_source = None
+        self._n_jobs = 1
+        self._pool = None
         self.set_rule_key(lambda rule: (rule.lift, rule.confidence,
                                         len(rule.antecedent)))
         self._apparent_support_threshold = None
@@ -30,14 +54,33 @@ class ARM(object):
         self._real_support_threshold = float('inf')
         self._real_confidence_threshold = float('inf')
         self._real_coverage_threshold = float('inf')
+        self._algorithm = None
+        self._itemsets = 'all'
+        self._max_length = None
+        self._frequent_itemsets = None
+        self._stats = LearnStats()
+        self._stats_callback = None
 
     @property
     def rules(self):
         """Get a list of rules generated using the loaded dataset."""
-        return list(filterfalse(
-            lambda rule: (self._apparent_support_threshold > rule.coverage
-                          or self._apparent_confidence_threshold > rule.confidence),
-            self._rules))
+        return self.rule_table.tolist()
+
+    @property
+    def rule_table(self):
+        """Get the rules generated using the loaded dataset as a RuleTable.
+
+        The table holds the rules passing the current thresholds, in the
+        same order as `rules`, and can be further filtered and sorted on
+        any metric without building lists of rules. The rules are indexed
+        by coverage and confidence, so that changing the thresholds after
+        learning does not rescan them.
+        """
+        if self._rule_table is None:
+            self._rule_table = RuleTable(self._rules).threshold_index(
+                'coverage', 'confidence')
+        return self._rule_table.query(self._apparent_support_threshold,
+                                      self._apparent_confidence_threshold)
 
     @property
     def support_threshold(self):
@@ -60,23 +103,290 @@ class ARM(object):
             List of transactions
         """
         self._clear()
+        self._append_rows(data)
+        self._build_index()
+
+    def _append_rows(self, data):
         for row in data:
             self._dataset.append(list(row))
 
-    def load_from_csv(self, filename):
+    def load_matrix(self, data, items=None):
+        """Load a set of transactions from a one-hot matrix, whose rows are
+        transactions and columns are items.
+
+        The index is built from the columns of `data` directly, without
+        copying its rows. NumPy is required.
+
+        Parameters
+        ----------
+        data : 2-D array_like, scipy.sparse matrix or pandas.DataFrame
+            Matrix whose nonzero entries mark the items of every
+            transaction.
+
+        items : list
+            Item of every column(Default None, which uses the columns of a
+            DataFrame, and the column indices otherwise).
+        """
+        self._clear()
+        n_rows, _ = get_shape(data)
+        self._set_item_bitsets(onehot_bitsets(data, items), n_rows)
+
+    def load_dataframe(self, frame):
+        """Load a set of transactions from a tabular pandas DataFrame.
+
+        As with a csv file, the value of every column of a row is an item
+        of its transaction. Missing values are left out.
+
+        Parameters
+        ----------
+        frame : pandas.DataFrame
+            The dataset, whose columns are treated as categorical.
+        """
+        self._clear()
+        self._set_item_bitsets(
+            [(value, bitset)
+             for _, value, bitset in categorical_bitsets(frame)],
+            len(frame))
+
+    def _set_item_bitsets(self, item_bitsets, size):
+        """Build the vertical index from the bitset of every item, given as
+        (item, bitset) pairs. Bitsets of the same item are merged.
+
+        The transactions are only decoded from the index when needed, see
+        `_get_dataset`.
+        """
+        bitsets = dict()
+        for item, bitset in item_bitsets:
+            bitsets[item] = bitsets.get(item, 0) | bitset
+        self._items = sorted((item for item, bitset in bitsets.items()
+                              if bitset), key=item_key)
+        self._item_ids = dict((item, i) for i, item in enumerate(self._items))
+        self._item_bitsets = [bitsets[item] for item in self._items]
+        self._full_bitset = (1 << size) - 1
+        self._datasize = size
+        self._dataset = None
+
+    def _get_dataset(self):
+        """Get the transactions as lists of items, decoding them from the
+        index if they were loaded from a matrix."""
+        if self._dataset is None:
+            self._dataset = [[] for _ in range(self._datasize)]
+            for item, bitset in zip(self._items, self._item_bitsets):
+                for i in indices_from_bitset(bitset):
+                    self._dataset[i].append(item)
+        return self._dataset
+
+    def update(self, data):
+        """Add a set of transactions to the loaded dataset, and update the
+        learned rules.
+
+        Rather than learning from scratch, the frequent itemsets found by
+        the last `learn` are maintained, in the manner of the FUP algorithm.
+        Their stored counts are increased by their counts in the new
+        transactions, while an itemset which was not frequent can only
+        become frequent if it is frequent enough among the new transactions,
+        and only those are counted in the whole dataset. Mining is
+        therefore mostly proportional to the number of new transactions.
+        The rules are then generated again from the maintained counts,
+        without counting, and pruned over the whole dataset, which takes as
+        long as it does in `learn` and dominates when there are many rules.
+
+        Parameters
+        ----------
+        data : Iterable of lists
+            List of new transactions.
+
+        Raises
+        ------
+        ValueError
+            If the dataset is streamed from a csv file, or if the rules were
+            not learned by `learn`.
+        """
+        if self._csv_source is not None:
+            raise ValueError("A dataset streamed from a csv file "
+                             "cannot be updated")
+        if self._frequent_itemsets is None and len(self._rules) > 0:
+            # Rules loaded by `load_model` or mined by `learn_top_k` have no
+            # frequent itemsets to maintain.
+            raise ValueError("Only rules learned using `learn` can be "
+                             "updated")
+        start = self._datasize
+        old_min_count = self._get_min_count() if start else 0
+        old_items = self._items
+        # Transactions loaded from a matrix are decoded to be extended.
+        self._get_dataset()
+        self._append_rows(data)
+        new_bitsets = self._build_index(start)
+        self._itemcounts.clear()
+        self._rule_table = None
+        if self._frequent_itemsets is None:
+            # Nothing was learned from the dataset yet.
+            return
+        if old_items is not self._items:
+            self._frequent_itemsets = dict(
+                (self._encode(old_items[i] for i in ids), count)
+                for ids, count in self._frequent_itemsets.items())
+
+        if old_min_count == 0 or self._engine_selects_itemsets():
+            # Every candidate was frequent, or only the closed or maximal
+            # itemsets were mined, so there is nothing to maintain.
+            thresholds = (self._apparent_support_threshold,
+                          self._apparent_confidence_threshold,
+                          self._apparent_coverage_threshold)
+            self._learn(self._real_support_threshold,
+                        self._real_confidence_threshold,
+                        self._real_coverage_threshold, self._algorithm,
+                        self._itemsets, self._max_length)
+            (self._apparent_support_threshold,
+             self._apparent_confidence_threshold,
+             self._apparent_coverage_threshold) = thresholds
+            return
+
+        stats_start = self._start_stats()
+        self._rules = []
+        counts = dict()
+        # The maintained counts are seeded into an unbounded cache, so the
+        # rules are generated without counting over the whole dataset.
+        cache = self._itemcounts
+        self._itemcounts = LRUCache()
+        try:
+            levels = self._record_levels(self._update_frequent_itemsets(
+                new_bitsets, self._datasize - start, old_min_count, counts))
+            for itemset in self._select_itemsets(levels, counts):
+                self._generate_rules(itemset)
+        finally:
+            self._restore_cache(cache)
+        self._frequent_itemsets = counts
+        self._finish_rules()
+        self._finish_stats(stats_start)
+
+    def _update_frequent_itemsets(self, new_bitsets, new_size, old_min_count,
+                                  counts):
+        """Update the frequent itemsets after new transactions were indexed,
+        yielding them one level at a time.
+
+        `new_bitsets` maps the ids of the items of the new transactions to
+        bitsets of those transactions only, and `old_min_count` is the
+        minimum count of a frequent itemset before the update. The counts
+        of the frequent itemsets are stored in `counts`, and in the cache.
+        """
+        old_frequent = self._frequent_itemsets
+        min_count = self._get_min_count()
+        # An itemset which was not frequent occurs at most
+        # `old_min_count - 1` times in the old transactions.
+        min_new_count = min_count - old_min_count + 1
+        start = self._datasize - new_size
+        new_full_bitset = self._full_bitset >> start
+        new_masks = [mask >> start for mask in self._get_count_masks()]
+
+        itemset = self._get_initial_itemset()
+        while len(itemset) > 0:
+            self._stats.add_candidates(len(itemset[0]), len(itemset))
+            frequent = []
+            for ids in itemset:
+                bitset = new_full_bitset
+                for i in ids:
+                    bitset &= new_bitsets.get(i, 0)
+                mask_counts = [popcount(bitset & mask) for mask in new_masks]
+                if ids in old_frequent:
+                    count = self._add_to_count(old_frequent[ids],
+                                               mask_counts)
+                elif sum(mask_counts) >= min_new_count:
+                    count = self._get_count(ids)
+                else:
+                    continue
+                if self._net_count(count) >= min_count:
+                    counts[ids] = count
+                    self._itemcounts[ids] = count
+                    frequent.append(ids)
+            if not frequent:
+                return
+            yield frequent
+            if len(frequent[0]) == self._max_length:
+                return
+            itemset = self._get_nextgen_itemset(frequent)
+
+    def load_from_csv(self, filename, chunk_size=None):
         """Load a set of transactions from a csv file.
 
         Parameters
         ----------
         filename : string
             Name of the csv file which contains a set of transactions
+
+        chunk_size : int
+            If given, the file is not loaded into memory. Instead `learn`
+            streams it `chunk_size` rows at a time, using the partition
+            based SON algorithm: itemsets frequent in any chunk are mined
+            first, and their global counts are found in a second pass. This
+            allows mining files larger than the available memory(Default
+            None).
         """
         self._clear()
-        import csv
+        if chunk_size is not None:
+            self._csv_source = (filename, chunk_size)
+            return
         with open(filename, newline='') as csvfile:
-            mycsv = csv.reader(csvfile)
-            for row in mycsv:
-                self._dataset.append(row)
+            for row in csv.reader(csvfile):
+                self._add_csv_row(row)
+        self._build_index()
+
+    def _add_csv_row(self, row):
+        self._dataset.append(row)
+
+    def save(self, filename):
+        """Save the learned rules to a file, which can be loaded using
+        `load_model`.
+
+        Only the rules passing the current thresholds are saved, in a
+        compact binary format. The dataset is not saved.
+
+        Parameters
+        ----------
+        filename : string
+            Name of the file the rules are saved to.
+        """
+        save_model(filename, self._get_model_info(), self.rules)
+
+    def _get_model_info(self):
+        if self._apparent_support_threshold is None:
+            raise ValueError("Rules must be learned before they are saved")
+        return ModelInfo(self._MODEL_KIND, self._datasize,
+                         self._apparent_support_threshold,
+                         self._apparent_confidence_threshold,
+                         self._apparent_coverage_threshold, None, False)
+
+    def load_model(self, filename):
+        """Load rules saved using `save`.
+
+        The file is memory-mapped rather than read, and rules are only
+        built when accessed, so loading is fast and processes loading the
+        same file share the memory holding the rules. As the dataset is not
+        saved, learning again discards the loaded rules.
+
+        Parameters
+        ----------
+        filename : string
+            Name of the file the rules were saved to.
+        """
+        model = CompiledModel(filename)
+        if model.info.kind != self._MODEL_KIND:
+            raise ValueError("'{}' was not saved by {}"
+                             .format(filename, type(self).__name__))
+        self._clear()
+        self._set_model(model)
+
+    def _set_model(self, model):
+        info = model.info
+        self._datasize = info.datasize
+        self._apparent_support_threshold = info.support_threshold
+        self._apparent_confidence_threshold = info.confidence_threshold
+        self._apparent_coverage_threshold = info.coverage_threshold
+        self._real_support_threshold = info.support_threshold
+        self._real_confidence_threshold = info.confidence_threshold
+        self._real_coverage_threshold = info.coverage_threshold
+        self._algorithm = None
+        self._rules = model.rules
 
     def set_rule_key(self, key):
         """Set the key function which should be used to sort rules.
@@ -92,36 +402,322 @@ class ARM(object):
         """
         self._rule_key = key
 
+    def set_cache_size(self, size):
+        """Set the maximum number of support counts which are memoized.
+
+        Support counts of itemsets are cached while learning, so that the
+        counts computed while pruning itemsets are reused during rule
+        generation. When the cache is full, the least recently used count
+        is evicted(Default 100000).
+
+        Parameters
+        ----------
+        size : int or None
+            Maximum number of cached counts. None means unbounded.
+        """
+        self._itemcounts.resize(size)
+
+    def cache_info(self):
+        """Get statistics of the support count cache.
+
+        Returns
+        -------
+        CacheInfo
+            Named tuple with `hits`, `misses`, `maxsize` and `currsize`.
+        """
+        return self._itemcounts.info()
+
+    def learn_stats(self):
+        """Get statistics of the last time rules were learned or updated.
+
+        Learning again at higher thresholds only filters the rules, and
+        does not change the statistics.
+
+        Returns
+        -------
+        LearnStats
+            Number of candidates and frequent itemsets by size, time spent
+            in each phase, peak number of rules and cache statistics.
+        """
+        return self._stats
+
+    def set_stats_callback(self, callback):
+        """Set a function to be called with the progress of learning.
+
+        It is called as `callback(event, stats)`, where `stats` is the
+        LearnStats being recorded, with `event` 'level' after the rules of
+        each level of frequent itemsets are generated, and 'done' once
+        learning is done.
+
+        Parameters
+        ----------
+        callback : function or None
+            The callback function. None removes it.
+        """
+        self._stats_callback = callback
+
+    def _notify_stats(self, event):
+        if self._stats_callback is not None:
+            self._stats_callback(event, self._stats)
+
+    def _restore_cache(self, cache):
+        """Put back the support count cache `cache`, which was replaced by
+        a temporary one. The lookups of the temporary cache are added to
+        the statistics of `cache`, so that `cache_info` counts them."""
+        cache.hits += self._itemcounts.hits
+        cache.misses += self._itemcounts.misses
+        self._itemcounts = cache
+
+    def _start_stats(self):
+        """Start recording new stats, returning the state to pass to
+        `_finish_stats`."""
+        self._stats = LearnStats()
+        return default_timer(), self.cache_info()
+
+    def _finish_stats(self, start):
+        start_time, start_info = start
+        self._stats.total_time = default_timer() - start_time
+        if self._csv_source is None:
+            info = self.cache_info()
+            self._stats.cache_info = CacheInfo(
+                info.hits - start_info.hits, info.misses - start_info.misses,
+                info.maxsize, info.currsize)
+        self._notify_stats('done')
+
+    def _record_levels(self, levels):
+        """Iterate over `levels` of frequent itemsets, recording their
+        stats.
+
+        The time spent producing a level is mining time, while the time
+        until the next level is requested is spent generating rules.
+        """
+        stats = self._stats
+        levels = iter(levels)
+        while True:
+            start = default_timer()
+            try:
+                itemset = next(levels)
+            except StopIteration:
+                stats.mining_time += default_timer() - start
+                return
+            generation_start = default_timer()
+            stats.mining_time += generation_start - start
+            yield itemset
+            stats.rule_generation_time += default_timer() - generation_start
+            if itemset:
+                stats.add_frequent(len(itemset[0]), len(itemset))
+            stats.peak_rules = max(stats.peak_rules, len(self._rules))
+            self._notify_stats('level')
+
     def _clear(self):
-        self._dataset = []
         self._rules = []
-        self._itemcounts = {}
+        self._rule_table = None
+        self._frequent_itemsets = None
+        self._csv_source = None
+        self._clear_dataset()
+
+    def _clear_dataset(self):
+        self._close_pool()
+        self._dataset = []
+        self._itemcounts.clear()
+        self._items = []
+        self._item_ids = {}
+        self._item_bitsets = []
+        self._full_bitset = 0
+        self._datasize = 0
+
+    def _iter_chunks(self):
+        """Iterate over the dataset one chunk at a time.
+
+        Each chunk is loaded in place of the dataset, with its own index,
+        before being yielded. If the dataset is held in memory, it is
+        yielded as a single chunk. Otherwise the index is emptied once the
+        last chunk is done, as its counts are not those of the dataset, and
+        only the total number of transactions is kept.
+        """
+        if self._csv_source is None:
+            yield
+            return
+        filename, chunk_size = self._csv_source
+        datasize = 0
+        with open(filename, newline='') as csvfile:
+            chunk = []
+            for row in csv.reader(csvfile):
+                chunk.append(row)
+                if len(chunk) == chunk_size:
+                    self._load_chunk(chunk)
+                    datasize += self._datasize
+                    yield
+                    chunk = []
+            if chunk:
+                self._load_chunk(chunk)
+                datasize += self._datasize
+                yield
+        self._clear_dataset()
+        self._datasize = datasize
+
+    def _load_chunk(self, rows):
+        self._clear_dataset()
+        for row in rows:
+            self._add_csv_row(row)
+        self._build_index()
+
+    def _build_index(self, start=0):
+        """Build a vertical index of the loaded dataset.
+
+        Items are encoded as dense integer ids, assigned in sorted order of
+        the items, and every id is mapped to a bitset, stored as an int,
+        whose i-th bit is set if the i-th transaction contains that item.
+        The support count of an itemset is then the popcount of the AND of
+        its bitsets.
+
+        If `start` is given, the index of the transactions before it is
+        extended with the following ones. If new items are seen, the ids
+        are reassigned to keep them in sorted order. The bitsets of the
+        items of the indexed transactions, relative to `start`, are
+        returned by id.
+        """
+        rows = dict()
+        for i, data in enumerate(self._dataset[start:]):
+            for item in data:
+                rows.setdefault(item, []).append(i)
+        size = len(self._dataset) - start
+        new_items = set(rows).difference(self._item_ids)
+        if new_items:
+            old_ids = self._item_ids
+            self._items = sorted(chain(self._items, new_items), key=item_key)
+            self._item_ids = dict((item, i)
+                                  for i, item in enumerate(self._items))
+            item_bitsets = [0] * len(self._items)
+            for item, i in old_ids.items():
+                item_bitsets[self._item_ids[item]] = self._item_bitsets[i]
+            self._item_bitsets = item_bitsets
+        new_bitsets = dict()
+        for item, indices in rows.items():
+            i = self._item_ids[item]
+            new_bitsets[i] = bitset_from_indices(indices, size)
+            self._item_bitsets[i] |= new_bitsets[i] << start
+        self._full_bitset = (1 << len(self._dataset)) - 1
+        self._datasize = len(self._dataset)
+        return new_bitsets
+
+    def _encode(self, items):
+        """Get the sorted tuple of ids of `items`.
+
+        Raises KeyError if an item does not occur in the dataset.
+        """
+        return tuple(sorted(set(self._item_ids[item] for item in items)))
+
+    def _decode(self, ids):
+        return tuple(self._items[i] for i in ids)
+
+    def _get_bitset(self, ids):
+        bitset = self._full_bitset
+        for i in ids:
+            bitset &= self._item_bitsets[i]
+            if not bitset:
+                break
+        return bitset
 
     def _clean_items(self, items):
         return tuple(items)
 
-    def _get_itemcount(self, items):
+    def _count_bitset(self, bitset):
+        return popcount(bitset)
+
+    def _get_count_masks(self):
+        """Get the bitsets a count is made of, for the counting workers."""
+        return [self._full_bitset]
+
+    def _make_count(self, mask_counts):
+        """Build a count from the popcounts of a bitset under each mask."""
+        return mask_counts[0]
+
+    def _get_pool(self):
+        if self._pool is None:
+            self._pool = CountingPool(self._n_jobs, self._item_bitsets,
+                                      self._full_bitset,
+                                      self._get_count_masks())
+        return self._pool
+
+    def _close_pool(self):
+        if self._pool is not None:
+            self._pool.close()
+            self._pool = None
+
+    @staticmethod
+    def _net_count(count):
+        return count
+
+    def _add_to_count(self, count, mask_counts):
+        """Add the popcounts of the bitset of new transactions under each
+        count mask to `count`."""
+        return count + mask_counts[0]
+
+    def _get_count(self, ids):
+        """Get the memoized count of the sorted tuple of ids `ids`."""
         try:
-            return self._itemcounts[tuple(set(items))]
+            return self._itemcounts[ids]
         except KeyError:
             pass
-        count = 0
-        for data in self._dataset:
-            found = True
-            for item in items:
-                if item not in data:
-                    found = False
-                    break
-            if found:
-                count += 1
+        count = self._count_bitset(self._get_bitset(ids))
+        self._itemcounts[ids] = count
         return count
 
+    def _get_counts(self, itemset):
+        """Get the counts of all the itemsets of a level at once.
+
+        The itemsets are expected in sorted order, so that those sharing a
+        prefix are adjacent and the bitset of the prefix is computed only
+        once for all of them. If several jobs were requested and enough
+        counts are not cached, they are counted by a pool of processes.
+        """
+        counts = []
+        missing = []
+        for i, ids in enumerate(itemset):
+            try:
+                counts.append(self._itemcounts[ids])
+            except KeyError:
+                counts.append(None)
+                missing.append(i)
+
+        if (self._n_jobs > 1
+                and len(missing) >= self._PARALLEL_MIN_CANDIDATES):
+            mask_counts = self._get_pool().count(
+                [itemset[i] for i in missing])
+            for i, mask_count in zip(missing, mask_counts):
+                counts[i] = self._make_count(mask_count)
+                self._itemcounts[itemset[i]] = counts[i]
+            return counts
+
+        prefix = None
+        prefix_bitset = self._full_bitset
+        for i in missing:
+            ids = itemset[i]
+            if ids[:-1] != prefix:
+                prefix = ids[:-1]
+                prefix_bitset = self._get_bitset(prefix)
+            counts[i] = self._count_bitset(prefix_bitset
+                                           & self._item_bitsets[ids[-1]])
+            self._itemcounts[ids] = counts[i]
+        return counts
+
+    def _lookup_count(self, items):
+        try:
+            ids = self._encode(items)
+        except KeyError:
+            return self._count_bitset(0)
+        return self._get_count(ids)
+
+    def _get_itemcount(self, items):
+        return self._net_count(self._lookup_count(items))
+
+    @staticmethod
+    def _merge_counts(count1, count2):
+        return count1 + count2
+
     def _get_initial_itemset(self):
-        itemset = []
-        items = set(chain(*self._dataset))
-        for item in items:
-            itemset.append([item])
-        return sorted(itemset)
+        return [(i,) for i in range(len(self._items))]
 
     def _should_join_candidate(self, candidate1, candidate2):
         for i in range(len(candidate1) - 1):
@@ -132,61 +728,126 @@ class ARM(object):
         return False
 
     def _get_nextgen_itemset(self, itemset):
+        """Generate the candidates of the next level from `itemset`.
+
+        Only itemsets sharing all but their last item can be joined, so the
+        level is grouped by that prefix and pairs are formed within each
+        group. A candidate is kept only if all its subsets one item smaller
+        are in `itemset`, as it cannot be frequent otherwise.
+        """
+        frequent = set(itemset)
         new_items = []
-        for i, _ in enumerate(itemset):
-            for j in range(i, len(itemset)):
-                if self._should_join_candidate(itemset[i], itemset[j]):
-                    new_items.append(sorted(set(itemset[i]).union(itemset[j])))
+        for _, group in groupby(sorted(itemset), key=itemgetter(slice(-1))):
+            group = list(group)
+            for i, candidate1 in enumerate(group):
+                for candidate2 in group[i + 1:]:
+                    if not self._should_join_candidate(candidate1, candidate2):
+                        continue
+                    candidate = candidate1 + candidate2[-1:]
+                    # Dropping either of the last two items gives back
+                    # candidate1 or candidate2, which are known frequent.
+                    if all(candidate[:j] + candidate[j + 1:] in frequent
+                           for j in range(len(candidate) - 2)):
+                        new_items.append(candidate)
         return new_items
 
+    def _is_frequent(self, count):
+        # Itemsets which never occur are not frequent, even at a support
+        # threshold of 0, as the mining engines never find them.
+        if count <= 0:
+            return False
+        support = round(count / self._datasize, 3)
+        return support >= self._real_support_threshold
+
+    def _get_min_count(self):
+        """Get the smallest support count accepted by `_is_frequent`."""
+        size = self._datasize
+        count = max(0, int((self._real_support_threshold - 0.001) * size))
+        while count <= size and not self._is_frequent(count):
+            count += 1
+        return count
+
     def _prune_itemset(self, itemset):
-        to_be_pruned = []
-        for items in itemset:
-            item_count = self._get_itemcount(items)
-            item_support = round(item_count / len(self._dataset), 3)
-            if item_support < self._real_support_threshold:
-                to_be_pruned.append(items)
+        self._stats.add_candidates(len(itemset[0]), len(itemset))
+        counts = self._get_counts(itemset)
+        itemset[:] = [items for items, count in zip(itemset, counts)
+                      if self._is_frequent(self._net_count(count))]
+
+    def _get_clean_item_bitsets(self):
+        """Get the bitset of the transactions containing each item, as
+        returned by `_clean_items`, which is how rules refer to them."""
+        bitsets = dict()
+        for item, bitset in zip(self._items, self._item_bitsets):
+            item, = self._clean_items((item,))
+            bitsets[item] = bitsets.get(item, 0) | bitset
+        return bitsets
 
-        for items in to_be_pruned:
-            itemset.remove(items)
+    def _get_rule_bitset(self, rule, item_bitsets):
+        bitset = self._full_bitset
+        for item in rule.antecedent:
+            bitset &= item_bitsets.get(item, 0)
+        return bitset
+
+    def _get_coverage_limit(self):
+        """Get the number of rules after which a transaction is covered."""
+        threshold = self._real_coverage_threshold
+        if threshold == float('inf'):
+            return None
+        return max(1, int(ceil(threshold)))
 
     def _prune_rules(self):
-        pruned_rules = []
-        data_cover_count = [0] * len(self._dataset)
-        for rule in self._rules:
-            rule_add = False
-            for i, data in enumerate(self._dataset):
-                items = self._clean_items(data)
-                if (rule.match_antecedent(items)
-                        and data_cover_count[i] >= 0):
-                    rule_add = True
-                    data_cover_count[i] += 1
-                    if data_cover_count[i] >= self._real_coverage_threshold:
-                        data_cover_count[i] = -1
-
-            if rule_add:
-                pruned_rules.append(rule)
-
-        self._rules = pruned_rules
+        # Transactions are covered independently of each other, so the
+        # chunks can be processed one after the other.
+        rule_add = [False] * len(self._rules)
+        limit = self._get_coverage_limit()
+        for _ in self._iter_chunks():
+            item_bitsets = self._get_clean_item_bitsets()
+            cover_count = BitsetCounter()
+            uncovered = self._full_bitset
+            for j, rule in enumerate(self._rules):
+                matched = self._get_rule_bitset(rule, item_bitsets) & uncovered
+                if matched:
+                    rule_add[j] = True
+                    if limit is not None:
+                        cover_count.increment(matched)
+                        uncovered &= ~cover_count.equal(limit, matched)
+
+        self._rules = [rule for j, rule in enumerate(self._rules)
+                       if rule_add[j]]
 
     def _print_items(self):
-        for item, count in self._itemcounts.items():
-            print(item, count)
+        for ids, count in self._itemcounts.items():
+            print(self._decode(ids), count)
 
     def _generate_rules(self, itemset):
+        """Generate rules from `itemset` and append them to the list of
+        rules.
+
+        Moving items of a rule from its antecedent to its consequent can
+        only lower its confidence. So, as in ap-genrules, consequents are
+        grown one item at a time, by joining only the consequents of rules
+        which pass the confidence threshold.
+        """
         for items in itemset:
-            subsets = get_subsets(items)
-            for element in subsets:
-                remain = set(items).difference(set(element))
-                if len(remain) > 0:
-                    count_lhs = self._get_itemcount(element)
-                    count_rhs = self._get_itemcount(remain)
-                    count_both = self._get_itemcount(items)
-                    rule = AssociationRule(tuple(element), tuple(remain),
-                                           count_both, count_lhs, count_rhs,
-                                           len(self._dataset))
+            count_both = self._get_count(items)
+            consequents = [(i,) for i in items]
+            while consequents:
+                passed = []
+                for consequent in consequents:
+                    antecedent = tuple(i for i in items
+                                       if i not in consequent)
+                    if len(antecedent) == 0:
+                        continue
+                    rule = AssociationRule(self._decode(antecedent),
+                                           self._decode(consequent),
+                                           count_both,
+                                           self._get_count(antecedent),
+                                           self._get_count(consequent),
+                                           self._datasize)
                     if (rule.confidence >= self._real_confidence_threshold):
                         self._rules.append(rule)
+                        passed.append(consequent)
+                consequents = self._get_nextgen_itemset(passed)
 
     def print_rules(self, attributes=('coverage', 'confidence', 'lift')):
         """Print the generated rules in a tabular format.
@@ -211,8 +872,150 @@ class ARM(object):
 
         print(table)
 
+    def _apriori(self):
+        itemset = self._get_initial_itemset()
+        while len(itemset) > 0:
+            self._prune_itemset(itemset)
+            yield itemset
+            if itemset and len(itemset[0]) == self._max_length:
+                return
+            itemset = self._get_nextgen_itemset(itemset)
+
+    def _group_by_size(self, frequent_itemsets, counts=None):
+        """Group the frequent itemsets, given with their counts, into levels.
+
+        If `counts` is given, the counts found by the mining engine are
+        stored in it and in the cache, so that they are not counted again.
+        """
+        levels = dict()
+        for ids, count in frequent_itemsets:
+            ids = tuple(sorted(ids))
+            levels.setdefault(len(ids), []).append(ids)
+            if counts is not None:
+                counts[ids] = count
+                self._itemcounts[ids] = count
+        for size in sorted(levels):
+            yield sorted(levels[size])
+
+    def _fpgrowth(self, itemsets='all', counts=None):
+        return self._group_by_size(
+            ((self._encode(items), count) for items, count
+             in fpgrowth(self._get_dataset(), self._get_min_count(),
+                         self._max_length, itemsets)), counts)
+
+    def _eclat(self, itemsets='all', counts=None):
+        return self._group_by_size(
+            eclat(dict(enumerate(self._item_bitsets)), self._get_min_count(),
+                  max_length=self._max_length, itemsets=itemsets), counts)
+
+    def _declat(self, itemsets='all', counts=None):
+        return self._group_by_size(
+            eclat(dict(enumerate(self._item_bitsets)), self._get_min_count(),
+                  diffsets=True, max_length=self._max_length,
+                  itemsets=itemsets), counts)
+
+    def _engine_selects_itemsets(self):
+        """Whether the mining engine finds only the closed or maximal
+        itemsets, rather than all the frequent ones being filtered.
+
+        Apriori and itemsets of a limited length are filtered, as are the
+        itemsets mined from chunks, which must all be counted in the
+        second pass.
+        """
+        return (self._itemsets != 'all'
+                and self._algorithm in ('fpgrowth', 'eclat', 'declat')
+                and self._max_length is None)
+
+    def _select_itemsets(self, levels, counts, itemsets=None):
+        """Filter `levels` of frequent itemsets to the closed or maximal
+        ones, if requested.
+
+        `itemsets` overrides the requested itemsets, as 'all' when the
+        mining engine already found only the closed or maximal ones.
+
+        An itemset is closed if none of its supersets has the same count,
+        and maximal if none of its supersets is frequent. The supersets
+        with one more item are enough to tell, so each level is yielded
+        once the next one is known. `counts` maps itemsets to their counts,
+        and the missing ones are added to it.
+        """
+        if itemsets is None:
+            itemsets = self._itemsets
+        previous = None
+        for itemset in chain(levels, [None]):
+            if itemset is not None:
+                for ids in itemset:
+                    if ids not in counts:
+                        counts[ids] = self._get_count(ids)
+            if itemsets == 'all':
+                if itemset is not None:
+                    yield itemset
+                continue
+
+            subsumed = set()
+            for ids in itemset or ():
+                for j in range(len(ids)):
+                    subset = ids[:j] + ids[j + 1:]
+                    if (itemsets == 'maximal'
+                            or counts.get(subset) == counts[ids]):
+                        subsumed.add(subset)
+            if previous is not None:
+                yield [ids for ids in previous if ids not in subsumed]
+            previous = itemset
+
+    def _learn_from_chunks(self, algorithm):
+        # Pass 1: Any itemset frequent in the whole file is frequent in at
+        # least one chunk, so the locally frequent ones are the candidates.
+        start = default_timer()
+        candidates = set()
+        for _ in self._iter_chunks():
+            for itemset in getattr(self, self._ALGORITHMS[algorithm])():
+                candidates.update(self._decode(ids) for ids in itemset)
+
+        # Pass 2: Count the candidates in the whole file.
+        counts = dict()
+        for _ in self._iter_chunks():
+            chunk_counts = dict()
+            present = []
+            for items in candidates:
+                try:
+                    present.append((self._encode(items), items))
+                except KeyError:
+                    chunk_counts[items] = self._count_bitset(0)
+            present.sort()
+            for (_, items), count in zip(
+                    present, self._get_counts([ids for ids, _ in present])):
+                chunk_counts[items] = count
+            for items, count in chunk_counts.items():
+                if items in counts:
+                    count = self._merge_counts(counts[items], count)
+                counts[items] = count
+
+        frequent = [items for items, count in counts.items()
+                    if self._is_frequent(self._net_count(count))]
+        self._items = sorted(set(chain(*frequent)), key=item_key)
+        self._item_ids = dict((item, i) for i, item in enumerate(self._items))
+        frequent = [(self._encode(items), counts[items]) for items in frequent]
+        self._stats.mining_time += default_timer() - start
+
+        # Rules are generated from the global counts, which are all known,
+        # so they are held in an unbounded cache meanwhile.
+        cache = self._itemcounts
+        self._itemcounts = LRUCache()
+        try:
+            for ids, count in frequent:
+                self._itemcounts[ids] = count
+            levels = self._record_levels(self._group_by_size(frequent))
+            for itemset in self._select_itemsets(levels, dict()):
+                self._generate_rules(itemset)
+        finally:
+            self._restore_cache(cache)
+        self._items = []
+        self._item_ids = {}
+
     def _learn(self, support_threshold, confidence_threshold,
-               coverage_threshold):
+               coverage_threshold, algorithm='apriori', itemsets='all',
+               max_length=None):
         self._apparent_support_threshold = support_threshold
         self._apparent_confidence_threshold = confidence_threshold
         self._apparent_coverage_threshold = coverage_threshold
@@ -220,20 +1023,50 @@ class ARM(object):
         self._real_support_threshold = support_threshold
         self._real_confidence_threshold = confidence_threshold
         self._real_coverage_threshold = coverage_threshold
-        
-        itemset = self._get_initial_itemset()
+        self._algorithm = algorithm
+        self._itemsets = itemsets
+        self._max_length = max_length
+
+        stats_start = self._start_stats()
         self._rules = []
-        while len(itemset) > 0:
-            self._prune_itemset(itemset)
-            self._generate_rules(itemset)
-            itemset = self._get_nextgen_itemset(itemset)
+        self._frequent_itemsets = None
+        try:
+            if self._csv_source is None:
+                frequent = dict()
+                engine = getattr(self, self._ALGORITHMS[algorithm])
+                selects = self._engine_selects_itemsets()
+                if algorithm == 'apriori':
+                    levels = engine()
+                else:
+                    # The supports found by the engine are only numbers of
+                    # transactions, which class-wise counts are not.
+                    levels = engine(itemsets if selects else 'all',
+                                    frequent if self._PLAIN_COUNTS else None)
+                levels = self._record_levels(levels)
+                selected = self._select_itemsets(
+                    levels, frequent, 'all' if selects else None)
+                for itemset in selected:
+                    self._generate_rules(itemset)
+                self._frequent_itemsets = frequent
+            else:
+                self._learn_from_chunks(algorithm)
+        finally:
+            self._close_pool()
+        self._finish_rules()
+        self._finish_stats(stats_start)
 
+    def _finish_rules(self):
+        """Deduplicate, prune and sort the generated rules."""
         self._rules = list(set(self._rules))
+        start = default_timer()
         self._prune_rules()
+        self._stats.prune_rules_time += default_timer() - start
         self._rules.sort(key=self._rule_key, reverse=True)
+        self._rule_table = None
 
     def learn(self, support_threshold, confidence_threshold,
-              coverage_threshold=20):
+              coverage_threshold=20, algorithm='apriori', n_jobs=1,
+              itemsets='all', max_length=None):
         """Generate Association rules from the Training dataset.
 
         Parameters
@@ -251,13 +1084,141 @@ class ARM(object):
             After it exceeds this, That row is no longer considered for
             matching other rules. Using this process all rules are removed,
             which do not match any transaction left(Default 20).
+
+        algorithm : str
+            Algorithm used to mine the frequent itemsets. One of 'apriori'
+            (level-wise candidate generation), 'fpgrowth' (FP-tree based
+            mining without candidate generation), 'eclat' (depth-first
+            mining with tid-set intersections) or 'declat' (Eclat using
+            diffsets, suited to dense data)(Default 'apriori').
+
+        n_jobs : int
+            Number of processes used to count the supports of candidate
+            itemsets. Negative values count back from the number of CPUs,
+            so -1 uses all of them. The rules do not depend on it(Default
+            1).
+
+        itemsets : str
+            Frequent itemsets rules are generated from. One of 'all',
+            'closed' (itemsets with no superset of the same support) or
+            'maximal' (itemsets with no frequent superset). Closed and
+            maximal itemsets summarize the frequent ones, so that far fewer
+            redundant rules are generated on dense data. 'fpgrowth',
+            'eclat' and 'declat' only search for these itemsets, unless
+            `max_length` is given or the dataset is streamed in chunks,
+            while 'apriori' filters the frequent ones(Default 'all').
+
+        max_length : int
+            Maximum number of items of a frequent itemset, and so of a rule.
+            Larger itemsets are not mined(Default None, which means no
+            limit).
         """
+        self._n_jobs = get_n_jobs(n_jobs)
+        if algorithm not in self._ALGORITHMS:
+            raise ValueError("Unknown algorithm '{}', expected one of {}"
+                             .format(algorithm, sorted(self._ALGORITHMS)))
+        if itemsets not in self._ITEMSETS:
+            raise ValueError("Unknown itemsets '{}', expected one of {}"
+                             .format(itemsets, list(self._ITEMSETS)))
         if (support_threshold < self._real_support_threshold
                 or confidence_threshold < self._real_confidence_threshold
-                or coverage_threshold != self._real_coverage_threshold):
+                or coverage_threshold != self._real_coverage_threshold
+                or algorithm != self._algorithm
+                or itemsets != self._itemsets
+                or max_length != self._max_length
+                # Raising the threshold can make an itemset maximal.
+                or (itemsets == 'maximal'
+                    and support_threshold != self._real_support_threshold)):
             self._learn(support_threshold, confidence_threshold,
-                        coverage_threshold)
+                        coverage_threshold, algorithm, itemsets, max_length)
 
         self._apparent_support_threshold = support_threshold
         self._apparent_confidence_threshold = confidence_threshold
         self._apparent_coverage_threshold = coverage_threshold
+
+    def learn_top_k(self, k, confidence_threshold, n_jobs=1):
+        """Generate the `k` Association rules with the highest support, out
+        of the rules with confidence at least `confidence_threshold`.
+
+        No support threshold is needed. Itemsets are counted level-wise,
+        the most frequent first, and once `k` rules are found the support
+        of the k-th rule becomes the support threshold, which rises as
+        better rules are found, so that less frequent itemsets and their
+        supersets are never counted. Among rules with the same support,
+        those ranked first by the rule key are kept. The rules are then
+        sorted by the rule key, and are not pruned by database coverage.
+
+        Afterwards, `support_threshold` is the support of the k-th rule.
+
+        Parameters
+        ----------
+        k : int
+            Number of rules to generate.
+
+        confidence_threshold : float
+            User defined threshold between 0 and 1. Rules with confidence
+            less than `confidence_threshold` are not generated.
+
+        n_jobs : int
+            Number of processes used to count the supports of candidate
+            itemsets, as in `learn`(Default 1).
+        """
+        if self._csv_source is not None:
+            raise ValueError("Top-k rules cannot be learned from a dataset "
+                             "streamed from a csv file")
+        self._n_jobs = get_n_jobs(n_jobs)
+        stats_start = self._start_stats()
+        self._real_confidence_threshold = confidence_threshold
+        self._real_coverage_threshold = float('inf')
+        # The rules do not depend on a support threshold, so that learning
+        # again at any threshold starts from scratch.
+        self._algorithm = None
+        self._frequent_itemsets = None
+
+        heap = []
+        # Number of rules seen, breaking ties as rules are not ordered.
+        n_rules = 0
+        min_count = 1
+        itemset = self._get_initial_itemset()
+        try:
+            while len(itemset) > 0 and k > 0:
+                self._stats.add_candidates(len(itemset[0]), len(itemset))
+                counts = [self._net_count(count)
+                          for count in self._get_counts(itemset)]
+                frequent = []
+                for count, ids in sorted(zip(counts, itemset), reverse=True):
+                    if count < min_count:
+                        break
+                    frequent.append((count, ids))
+                    self._rules = []
+                    self._generate_rules([ids])
+                    for rule in self._rules:
+                        n_rules += 1
+                        entry = (rule._count_both, self._rule_key(rule),
+                                 n_rules, rule)
+                        if len(heap) < k:
+                            heappush(heap, entry)
+                        elif entry[:2] > heap[0][:2]:
+                            heappushpop(heap, entry)
+                    if len(heap) == k:
+                        min_count = heap[0][0]
+                # The threshold may have risen since an itemset was kept.
+                frequent = [ids for count, ids in frequent
+                            if count >= min_count]
+                if frequent:
+                    self._stats.add_frequent(len(frequent[0]), len(frequent))
+                itemset = self._get_nextgen_itemset(frequent)
+        finally:
+            self._close_pool()
+
+        self._rules = [entry[-1] for entry in heap]
+        self._stats.peak_rules = len(self._rules)
+        support_threshold = 0
+        if self._datasize and heap:
+            support_threshold = heap[0][0] / self._datasize
+        self._real_support_threshold = support_threshold
+        self._apparent_support_threshold = support_threshold
+        self._apparent_confidence_threshold = confidence_threshold
+        self._apparent_coverage_threshold = float('inf')
+        self._finish_rules()
+        self._finish_stats(stats_start)
@@ -1,8 +1,12 @@
-from io import open
 from operator import itemgetter
 
 from .armine import ARM
+from .matcher import RuleMatcher
+from .model import save_model, MODEL_CLASSIFIER
+from .predictor import Predictor
+from .matrix import get_shape, onehot_bitsets, categorical_bitsets
 from .rule import ClassificationRule
+from .utils import popcount, bitset_from_indices
 
 
 class ARMClassifier(ARM):
@@ -13,19 +17,30 @@ class ARMClassifier(ARM):
     class to classify unclassified data instances. The classification is done
     using a modified version of the CBA Algorithm.
     """
+    _MODEL_KIND = MODEL_CLASSIFIER
+    _PLAIN_COUNTS = False
+
     def __init__(self):
         super(ARMClassifier, self).__init__()
         self._classes = []
+        self._class_bitsets = {}
+        self._class_counts = {}
+        self._item_features = []
         self._default_class = None
         self._transactional_database = False
+        self._label_index = 0
+        self._matcher = None
+        self._matcher_thresholds = None
+        self._predictor = None
 
     def load(self, data, transactional_database=False):
         """Load dataset from a Dictionary.
 
         Parameters
         ----------
-        data : dict
-            Dictionary with keys as features and values as labels.
+        data : dict or Iterable of (features, label)
+            Dictionary with keys as features and values as labels. Data
+            instances with the same features are given as pairs instead.
 
         transactional_database : bool
             Whether the database is transactional(Default False).
@@ -38,17 +53,88 @@ class ARMClassifier(ARM):
         a distinct feature.
         """
         self._clear()
-        for features, label in data.items():
-            if not transactional_database:
-                features = ["feature{}-{}".format(i+1, feature)
-                            for i, feature in enumerate(features)]
+        self._transactional_database = transactional_database
+        self._append_rows(data)
+        self._build_index()
+
+    def _append_rows(self, data):
+        if hasattr(data, 'items'):
+            data = data.items()
+        for features, label in data:
+            if not self._transactional_database:
+                features = list(enumerate(features))
             self._dataset.append(tuple(features))
             self._classes.append(label)
 
-        self._transactional_database = transactional_database
+    def update(self, data):
+        """Add data instances to the loaded dataset, and update the learned
+        rules. See `ARM.update`.
+
+        Parameters
+        ----------
+        data : dict or Iterable of (features, label)
+            Dictionary with keys as features and values as labels, in the
+            same format as the loaded dataset.
+        """
+        super(ARMClassifier, self).update(data)
+
+    def load_matrix(self, data, labels, items=None):
+        """Load a transactional dataset from a one-hot matrix, whose rows
+        are transactions and columns are items, and their labels.
+
+        See `ARM.load_matrix`.
+
+        Parameters
+        ----------
+        data : 2-D array_like, scipy.sparse matrix or pandas.DataFrame
+            Matrix whose nonzero entries mark the items of every
+            transaction.
+
+        labels : array_like
+            Label of every transaction.
+
+        items : list
+            Item of every column(Default None, which uses the columns of a
+            DataFrame, and the column indices otherwise).
+        """
+        self._clear()
+        self._transactional_database = True
+        n_rows, _ = get_shape(data)
+        self._set_labels(labels, n_rows)
+        self._set_item_bitsets(onehot_bitsets(data, items), n_rows)
+
+    def load_dataframe(self, frame, labels):
+        """Load a tabular dataset from a pandas DataFrame, and its labels.
+
+        Every column is a categorical feature, as with a non transactional
+        database. Missing values are left out.
+
+        Parameters
+        ----------
+        frame : pandas.DataFrame
+            The features of the data instances.
+
+        labels : array_like
+            Label of every data instance.
+        """
+        self._clear()
+        self._transactional_database = False
+        self._set_labels(labels, len(frame))
+        self._set_item_bitsets(
+            [((j, value), bitset)
+             for j, value, bitset in categorical_bitsets(frame)],
+            len(frame))
+
+    def _set_labels(self, labels, size):
+        if hasattr(labels, 'tolist'):
+            labels = labels.tolist()
+        self._classes = list(labels)
+        if len(self._classes) != size:
+            raise ValueError("Expected {} labels, got {}"
+                             .format(size, len(self._classes)))
 
     def load_from_csv(self, filename, label_index=0,
-                      transactional_database=False):
+                      transactional_database=False, chunk_size=None):
         """Load dataset from a csv file.
 
         Parameters
@@ -63,68 +149,132 @@ class ARMClassifier(ARM):
 
         transactional_database : bool
             Whether the database is transactional(Default False).
-        """
-        self._clear()
-        import csv
-        with open(filename, newline='') as csvfile:
-            mycsv = csv.reader(csvfile)
-            for row in mycsv:
-                label = row[label_index]
-                if label_index >= 0:
-                    features = row[:label_index] + row[label_index + 1:]
-                else:
-                    features = (row[:len(row) + label_index]
-                                + row[len(row) + label_index + 1:])
-                if not transactional_database:
-                    features = ["feature{}-{}".format(i+1, feature)
-                                for i, feature in enumerate(features)]
-                self._dataset.append(tuple(features))
-                self._classes.append(label)
 
+        chunk_size : int
+            If given, the file is streamed `chunk_size` rows at a time while
+            learning instead of being loaded into memory. See
+            `ARM.load_from_csv`(Default None).
+        """
+        self._label_index = label_index
         self._transactional_database = transactional_database
+        super(ARMClassifier, self).load_from_csv(filename, chunk_size)
+
+    def save(self, filename):
+        """Save the learned rules, along with the index used to classify
+        data instances, to a file. See `ARM.save`.
+
+        Parameters
+        ----------
+        filename : string
+            Name of the file the rules are saved to.
+        """
+        save_model(filename, self._get_model_info(), self.rules,
+                   self._get_matcher())
+
+    def _get_model_info(self):
+        info = super(ARMClassifier, self)._get_model_info()
+        return info._replace(
+            default_class=self._default_class,
+            transactional_database=self._transactional_database)
+
+    def _set_model(self, model):
+        super(ARMClassifier, self)._set_model(model)
+        self._default_class = model.info.default_class
+        self._transactional_database = model.info.transactional_database
+        self._matcher = RuleMatcher(self._rules, _index=model.matcher_index)
+        self._matcher_thresholds = (self._apparent_support_threshold,
+                                    self._apparent_confidence_threshold)
+
+    def _add_csv_row(self, row):
+        label_index = self._label_index
+        label = row[label_index]
+        if label_index >= 0:
+            features = row[:label_index] + row[label_index + 1:]
+        else:
+            features = (row[:len(row) + label_index]
+                        + row[len(row) + label_index + 1:])
+        if not self._transactional_database:
+            features = list(enumerate(features))
+        self._dataset.append(tuple(features))
+        self._classes.append(label)
 
     def _clear(self):
         super(ARMClassifier, self)._clear()
+        self._matcher = None
+
+    def _clear_dataset(self):
+        super(ARMClassifier, self)._clear_dataset()
         self._classes = []
+        self._class_bitsets = {}
+        self._class_counts = {}
+        self._item_features = []
+
+    def _build_index(self, start=0):
+        new_bitsets = super(ARMClassifier, self)._build_index(start)
+        self._index_classes(start)
+        return new_bitsets
+
+    def _set_item_bitsets(self, item_bitsets, size):
+        super(ARMClassifier, self)._set_item_bitsets(item_bitsets, size)
+        self._index_classes(0)
+
+    def _index_classes(self, start):
+        """Index the labels from the `start`-th data instance on."""
+        rows = dict()
+        for i, label in enumerate(self._classes[start:]):
+            rows.setdefault(label, []).append(i)
+        size = len(self._classes) - start
+        for label, indices in rows.items():
+            self._class_bitsets[label] = (
+                self._class_bitsets.get(label, 0)
+                | bitset_from_indices(indices, size) << start)
+            self._class_counts[label] = (self._class_counts.get(label, 0)
+                                         + len(indices))
+        if not self._transactional_database:
+            self._item_features = [feature for feature, _ in self._items]
 
     def _clean_items(self, items):
         if not self._transactional_database:
-            return tuple([feature.split('-')[1] for feature in items])
+            return tuple([value for _, value in items])
         else:
             return tuple(items)
 
-    def _get_itemcount(self, items):
-        try:
-            classwise_count = self._itemcounts[tuple(set(items))]
-        except KeyError:
-            classwise_count = self._get_classwise_count(items)
-        return self._get_itemcount_from_classwise_count(classwise_count)
-
     def _should_join_candidate(self, candidate1, candidate2):
         if not self._transactional_database:
             # If the last entry of both candidates belong to different
             # classes in a non transactional database
             # then they cannot be joined as the resulting
             # candidate would have support 0.
-            feature1 = candidate1[-1].split('-')[0]
-            feature2 = candidate2[-1].split('-')[0]
+            feature1 = self._item_features[candidate1[-1]]
+            feature2 = self._item_features[candidate2[-1]]
             if (feature1 == feature2):
                 return False
         return super(ARMClassifier, self)._should_join_candidate(candidate1, candidate2)
 
     def _get_classwise_count(self, items):
+        return self._lookup_count(items)
+
+    def _count_bitset(self, bitset):
+        count_class = dict()
+        for label, class_bitset in self._class_bitsets.items():
+            count_class[label] = [popcount(bitset & class_bitset),
+                                  self._class_counts[label]]
+        return count_class
+
+    def _get_count_masks(self):
+        return list(self._class_bitsets.values())
+
+    def _make_count(self, mask_counts):
+        count_class = dict()
+        for label, itemcount in zip(self._class_bitsets, mask_counts):
+            count_class[label] = [itemcount, self._class_counts[label]]
+        return count_class
+
+    def _add_to_count(self, count, mask_counts):
         count_class = dict()
-        for key in set(self._classes):
-            count_class[key] = [0, 0]
-        for i, data in enumerate(self._dataset):
-            found = True
-            for item in items:
-                if item not in data:
-                    found = False
-                    break
-            if found:
-                count_class[self._classes[i]][0] += 1
-            count_class[self._classes[i]][1] += 1
+        for label, itemcount in zip(self._class_bitsets, mask_counts):
+            count_class[label] = [count.get(label, [0])[0] + itemcount,
+                                  self._class_counts[label]]
         return count_class
 
     @staticmethod
@@ -134,51 +284,100 @@ class ARMClassifier(ARM):
             net_itemcount += itemcount
         return net_itemcount
 
+    _net_count = _get_itemcount_from_classwise_count
+
+    @staticmethod
+    def _merge_counts(count1, count2):
+        merged = dict((label, list(counts)) for label, counts in count1.items())
+        for label, (itemcount, classcount) in count2.items():
+            counts = merged.setdefault(label, [0, 0])
+            counts[0] += itemcount
+            counts[1] += classcount
+        return merged
+
     def _generate_rules(self, itemset):
         """Generates classification rules from itemset and appends them to
-        the list of rules"""
-        for items in itemset:
-            if len(items) > 0:
-                rules = []
-                for label in set(self._classes):
-                    classwise_count = self._get_classwise_count(tuple(items))
-                    count_lhs = self._get_itemcount_from_classwise_count(
-                                  classwise_count)
-                    count_rhs = classwise_count[label][1]
-                    count_both = classwise_count[label][0]
-                    antecedent = self._clean_items(items)
-                    rule = ClassificationRule(antecedent, label,
-                                              count_both, count_lhs, count_rhs,
-                                              len(self._dataset))
-                    if (rule.confidence >= self._real_confidence_threshold):
-                        rules.append(rule)
-                rules.sort(key=self._rule_key)
-                try:
-                    self._rules.append(rules[-1])
-                except IndexError:
-                    pass
+        the list of rules.
+
+        The class-wise counts of the whole level are computed at once, and
+        each count holds the counts in every class, so a single count per
+        itemset gives the rules for all the labels."""
+        itemset = [items for items in itemset if len(items) > 0]
+        for items, classwise_count in zip(itemset,
+                                          self._get_counts(itemset)):
+            count_lhs = self._get_itemcount_from_classwise_count(
+                classwise_count)
+            antecedent = self._clean_items(self._decode(items))
+            rules = []
+            for label, (count_both, count_rhs) in classwise_count.items():
+                rule = ClassificationRule(antecedent, label,
+                                          count_both, count_lhs, count_rhs,
+                                          self._datasize)
+                if (rule.confidence >= self._real_confidence_threshold):
+                    rules.append(rule)
+            rules.sort(key=self._rule_key)
+            try:
+                self._rules.append(rules[-1])
+            except IndexError:
+                pass
 
     def _update_default_class(self):
-        counter = dict.fromkeys(set(self._classes), 0)
-        for i, _ in enumerate(self._dataset):
-            is_match = False
-            for rule in self.rules:
-                items = self._clean_items(self._dataset[i])
-                if (rule.match_antecedent(items) and
-                        rule.match_consequent(self._classes[i])):
-                    is_match = True
-                    break
-            if is_match is False:
-                counter[self._classes[i]] += 1
+        """Set the default class to the most frequent class among the
+        transactions which no rule classifies correctly.
+
+        The transactions classified correctly by a rule are those matching
+        its antecedent, and in the class of its consequent, so they are
+        found with the same row bitsets as in `_prune_rules`.
+        """
+        rules = self._rules
+        counter = dict()
+        for _ in self._iter_chunks():
+            item_bitsets = self._get_clean_item_bitsets()
+            covered = 0
+            for rule in rules:
+                covered |= (self._get_rule_bitset(rule, item_bitsets)
+                            & self._class_bitsets.get(rule.consequent, 0))
+            for label, class_bitset in self._class_bitsets.items():
+                counter[label] = (counter.get(label, 0)
+                                  + popcount(class_bitset & ~covered))
         self._default_class = max(counter.items(), key=itemgetter(1))[0]
 
-    def _learn(self, support_threshold, confidence_threshold,
-              coverage_threshold):
-        super(ARMClassifier, self)._learn(support_threshold,
-                                          confidence_threshold,
-                                          coverage_threshold)
+    def _finish_rules(self):
+        super(ARMClassifier, self)._finish_rules()
+        self._matcher = None
         self._update_default_class()
 
+    def _get_matcher(self):
+        """Get the index of the rules passing the current thresholds.
+
+        It is built on first use and rebuilt only when the rules or the
+        thresholds change.
+        """
+        thresholds = (self._apparent_support_threshold,
+                      self._apparent_confidence_threshold)
+        if self._matcher is None or self._matcher_thresholds != thresholds:
+            self._matcher = RuleMatcher(self.rules)
+            self._matcher_thresholds = thresholds
+        return self._matcher
+
+    def predictor(self):
+        """Get an immutable `Predictor` using the rules passing the current
+        thresholds.
+
+        Unlike the classifier, the predictor is not affected by loading or
+        learning again, so it can be shared across threads while a new
+        model is trained, then replaced using an `AtomicPredictor`.
+
+        Returns
+        -------
+        Predictor
+        """
+        matcher = self._get_matcher()
+        if self._predictor is None or self._predictor._matcher is not matcher:
+            self._predictor = Predictor(matcher, self._default_class,
+                                        self._transactional_database)
+        return self._predictor
+
     def classify(self, data_instance, top_k_rules=25):
         """Classify `data_instance` using rules generated by `learn` method.
 
@@ -205,17 +404,22 @@ class ARMClassifier(ARM):
         at a low support and confidence_threshold, which reduces optimization
         time.
         """
-        matching_rules = []
-        for rule in self.rules:
-            if rule.match_antecedent(data_instance):
-                matching_rules.append(rule)
-            if len(matching_rules) == top_k_rules:
-                break
-        if len(matching_rules) > 0:
-            score = dict()
-            for rule in matching_rules:
-                label = rule.consequent
-                score[label] = (score.get(label, 0) + rule.lift)
-            return max(score.items(), key=itemgetter(1))[0]
-        else:
-            return self._default_class
+        return self.predictor().classify(data_instance, top_k_rules)
+
+    def classify_many(self, data_instances, top_k_rules=25):
+        """Classify every instance of `data_instances`, matching the whole
+        batch against the rules at once.
+
+        Returns
+        -------
+        list
+            Predicted label of every instance, as returned by `classify`.
+        """
+        return self.predictor().classify_many(data_instances, top_k_rules)
+
+    def predict(self, data, top_k_rules=25, items=None, return_scores=False):
+        """Classify a batch of data instances given as a matrix or a list,
+        returning NumPy arrays. See `Predictor.predict`.
+        """
+        return self.predictor().predict(data, top_k_rules, items,
+                                        return_scores)
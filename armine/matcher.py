@@ -0,0 +1,145 @@
+from array import array
+from heapq import merge
+from itertools import repeat
+
+
+class RuleMatcher(object):
+    """Read-only index to find the rules whose antecedent matches a set of
+    items.
+
+    The rules are numbered in the order they are given, which is their
+    priority, and every antecedent item is mapped to the increasing list of
+    ids of the rules containing it. Merging the lists of the items of a
+    data instance yields the ids of the candidate rules in priority order,
+    and a rule matches once it has been seen as many times as it has
+    antecedent items. Finding the top rules therefore only touches the
+    rules sharing items with the instance, and stops as soon as enough of
+    them are found.
+
+    Parameters
+    ----------
+    rules : Iterable of AssociationRule
+        Rules sorted by priority.
+    """
+    def __init__(self, rules, _index=None):
+        if _index is not None:
+            # An index saved with a model, over a sequence of its rules.
+            self._rules = rules
+            self._sizes, self._postings, self._always = _index
+            return
+        self._rules = list(rules)
+        self._sizes = array('l')
+        self._postings = dict()
+        # Rules with an empty antecedent match every instance.
+        self._always = array('l')
+        for rule_id, rule in enumerate(self._rules):
+            antecedent = set(rule.antecedent)
+            self._sizes.append(max(len(antecedent), 1))
+            if not antecedent:
+                self._always.append(rule_id)
+            for item in antecedent:
+                self._postings.setdefault(item, array('l')).append(rule_id)
+
+    def __len__(self):
+        return len(self._rules)
+
+    @property
+    def rules(self):
+        return self._rules
+
+    def match_ids(self, items, top_k=None):
+        """Get the ids of the first `top_k` rules matching `items`.
+
+        Parameters
+        ----------
+        items : Iterable
+            Items of the data instance.
+
+        top_k : int
+            Maximum number of rule ids returned(Default None, which returns
+            all matching rules).
+        """
+        if top_k == 0:
+            return []
+        postings = [self._postings[item] for item in set(items)
+                    if item in self._postings]
+        postings.append(self._always)
+        sizes = self._sizes
+        matches = []
+        current = -1
+        seen = 0
+        for rule_id in merge(*postings):
+            if rule_id != current:
+                current = rule_id
+                seen = 0
+            seen += 1
+            if seen == sizes[rule_id]:
+                matches.append(rule_id)
+                if len(matches) == top_k:
+                    break
+        return matches
+
+    def match(self, items, top_k=None):
+        """Get the first `top_k` rules matching `items`."""
+        return [self._rules[rule_id]
+                for rule_id in self.match_ids(items, top_k)]
+
+    def match_bitsets(self, item_bitsets, size, top_k=None):
+        """Find the rules matching a batch of data instances at once.
+
+        The rows matched by a rule are the AND of the bitsets of its
+        antecedent items. Going through the rules in priority order, the
+        k-th bit of a row is carried to `levels[k - 1]`, so the rows which
+        already have `top_k` rules are masked out with a single operation.
+
+        Parameters
+        ----------
+        item_bitsets : dict
+            Bitset of the rows containing every item.
+
+        size : int
+            Number of data instances of the batch.
+
+        top_k : int
+            Maximum number of rules matched by a row(Default None, which
+            matches all rules).
+
+        Returns
+        -------
+        Iterator of (int, int)
+            The id of every rule, in priority order, and the bitset of the
+            rows it is one of the first `top_k` matches of. Rules matching
+            no row are left out.
+        """
+        if top_k == 0 or size == 0:
+            return
+        full = (1 << size) - 1
+        streams = [zip(self._postings[item], repeat(bitset))
+                   for item, bitset in item_bitsets.items()
+                   if item in self._postings]
+        streams.append(zip(self._always, repeat(full)))
+        sizes = self._sizes
+        levels = [0] * (top_k or 0)
+        depth = 0
+        current = -1
+        for rule_id, bitset in merge(*streams):
+            if rule_id != current:
+                current = rule_id
+                seen = 0
+                rows = full
+            seen += 1
+            rows &= bitset
+            if seen != sizes[rule_id]:
+                continue
+            if levels:
+                rows &= ~levels[-1]
+                if not rows:
+                    continue
+                for k in range(min(depth, top_k - 1), 0, -1):
+                    levels[k] |= levels[k - 1] & rows
+                levels[0] |= rows
+                depth = min(depth + 1, top_k)
+            if rows:
+                yield rule_id, rows
+            if levels and levels[-1] == full:
+                return
@@ -0,0 +1,115 @@
+"""Conversion of matrices to the bitsets of a vertical index.
+
+NumPy arrays, scipy.sparse matrices and pandas DataFrames are recognized
+by their attributes, so none of these packages is required unless such a
+matrix is loaded. Columns are packed into bitsets with NumPy, without
+building a Python object per row.
+"""
+from .utils import _bytes_to_int
+
+
+def _pack(column):
+    """Get the bitset of the rows of a boolean NumPy column."""
+    import numpy as np
+    return _bytes_to_int(np.packbits(column, bitorder='little').tobytes())
+
+
+def _pack_rows(rows, n_rows):
+    """Get the bitset of the rows at the NumPy indices `rows`, without
+    building a dense column."""
+    import numpy as np
+    buf = np.zeros((n_rows + 7) // 8, dtype=np.uint8)
+    rows = np.asarray(rows, dtype=np.intp)
+    np.bitwise_or.at(buf, rows >> 3,
+                     np.left_shift(1, rows & 7).astype(np.uint8))
+    return _bytes_to_int(buf.tobytes())
+
+
+def _is_dataframe(data):
+    return hasattr(data, 'columns') and hasattr(data, 'iloc')
+
+
+def _is_sparse(data):
+    return hasattr(data, 'tocsc') and hasattr(data, 'nnz')
+
+
+def get_shape(data):
+    """Get the number of rows and columns of a 2-D matrix."""
+    if not hasattr(data, 'shape'):
+        import numpy as np
+        data = np.asarray(data)
+    if len(data.shape) != 2:
+        raise ValueError("Expected a 2-D matrix, got shape {}"
+                         .format(data.shape))
+    return data.shape
+
+
+def onehot_bitsets(data, items=None):
+    """Get the bitset of the rows of every column of a one-hot matrix.
+
+    Parameters
+    ----------
+    data : 2-D array_like, scipy.sparse matrix or pandas.DataFrame
+        Matrix whose nonzero entries mark the items of every row.
+
+    items : list
+        Item of every column(Default None, which uses the columns of a
+        DataFrame, and the column indices otherwise).
+
+    Returns
+    -------
+    list of (item, int)
+    """
+    import numpy as np
+    n_rows, n_cols = get_shape(data)
+    if items is None:
+        if _is_dataframe(data):
+            items = data.columns.tolist()
+        else:
+            items = list(range(n_cols))
+    if len(items) != n_cols:
+        raise ValueError("Expected {} items, got {}"
+                         .format(n_cols, len(items)))
+
+    if _is_sparse(data):
+        # Only the row indices of the nonzero entries are read, so memory
+        # stays proportional to the number of nonzero entries.
+        matrix = data.tocsc(copy=True)
+        matrix.eliminate_zeros()
+        indptr = matrix.indptr
+        return [(item,
+                 _pack_rows(matrix.indices[indptr[j]:indptr[j + 1]], n_rows))
+                for j, item in enumerate(items)]
+    if _is_dataframe(data):
+        data = data.to_numpy()
+    columns = np.asarray(data).astype(bool).T
+    return [(item, _pack(column))
+            for item, column in zip(items, columns)]
+
+
+def categorical_bitsets(frame):
+    """Get the bitset of the rows of every value of every column of a
+    DataFrame. Missing values are left out.
+
+    Returns
+    -------
+    list of (int, object, int)
+        The index of the column, the value and its bitset.
+    """
+    import numpy as np
+    n_rows = len(frame)
+    result = []
+    for j, name in enumerate(frame.columns):
+        column = frame[name].astype('category')
+        # As Python objects, so that values compare and hash as the
+        # values of a list of data instances do.
+        categories = column.cat.categories.tolist()
+        # The rows are grouped by code with a single sort, rather than
+        # scanning the column once per value. Missing values have code -1.
+        codes = column.cat.codes.to_numpy().astype(np.intp) + 1
+        order = np.argsort(codes, kind='stable')
+        bounds = np.cumsum(np.bincount(codes, minlength=len(categories) + 1))
+        for code, value in enumerate(categories):
+            rows = order[bounds[code]:bounds[code + 1]]
+            result.append((j, value, _pack_rows(rows, n_rows)))
+    return result
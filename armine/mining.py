@@ -0,0 +1,421 @@
+"""Frequent itemset mining engines used as alternatives to Apriori.
+
+Every engine is a generator yielding ``(itemset, count)`` pairs, where
+`itemset` is a tuple of items and `count` is the number of transactions
+which contain all of them.
+
+The engines can also mine only the closed itemsets, which have no superset
+of the same count, or the maximal ones, which have no frequent superset.
+The search then skips most of the other frequent itemsets rather than
+enumerating and filtering them, so its cost depends on the number of
+closed or maximal itemsets.
+"""
+from itertools import combinations
+
+from .utils import popcount
+
+
+class _Subsumption(object):
+    """Collect the candidate closed or maximal itemsets found by a search.
+
+    A candidate is dropped if another candidate is a superset of it with the
+    same count, or with any count for maximal itemsets. Every closed or
+    maximal itemset must be a candidate, while the others need not be, so
+    the result does not depend on the order of the search.
+    """
+    def __init__(self, maximal):
+        self.maximal = maximal
+        self._candidates = dict()
+        # Ids of the candidates containing every item, for `covers`.
+        self._postings = dict()
+
+    def add(self, items, count):
+        items = frozenset(items)
+        if items in self._candidates:
+            return
+        self._candidates[items] = count
+        if self.maximal:
+            for item in items:
+                self._postings.setdefault(item, set()).add(items)
+
+    def covers(self, items):
+        """Whether a maximal candidate is a superset of `items`."""
+        postings = []
+        for item in items:
+            if item not in self._postings:
+                return False
+            postings.append(self._postings[item])
+        if not postings:
+            return bool(self._candidates)
+        postings.sort(key=len)
+        return bool(postings[0].intersection(*postings[1:]))
+
+    def __iter__(self):
+        # Supersets are kept before their subsets are looked at.
+        kept = dict()
+        for items in sorted(self._candidates, key=len, reverse=True):
+            count = self._candidates[items]
+            key = None if self.maximal else count
+            postings = kept.setdefault(key, dict())
+            supersets = None
+            for item in items:
+                other = postings.get(item, ())
+                supersets = (set(other) if supersets is None
+                             else supersets.intersection(other))
+                if not supersets:
+                    break
+            if supersets:
+                continue
+            for item in items:
+                postings.setdefault(item, set()).add(items)
+            yield tuple(items), count
+
+
+def _check_itemsets(itemsets, max_length):
+    if itemsets not in ('all', 'closed', 'maximal'):
+        raise ValueError("Unknown itemsets '{}'".format(itemsets))
+    if itemsets != 'all' and max_length is not None:
+        raise ValueError("max_length cannot be combined with {} itemsets"
+                         .format(itemsets))
+
+
+class _FPNode(object):
+    __slots__ = ('item', 'count', 'parent', 'children')
+
+    def __init__(self, item, parent):
+        self.item = item
+        self.count = 0
+        self.parent = parent
+        self.children = {}
+
+
+class _FPTree(object):
+    """Prefix tree of transactions, with items ordered by descending count.
+
+    Parameters
+    ----------
+    transactions : list of (items, count)
+        Weighted transactions. It is iterated twice.
+
+    min_count : int
+        Items occurring in fewer transactions are left out of the tree.
+    """
+    def __init__(self, transactions, min_count):
+        counts = dict()
+        for items, count in transactions:
+            for item in items:
+                counts[item] = counts.get(item, 0) + count
+        self.counts = dict((item, count) for item, count in counts.items()
+                           if count >= min_count)
+        order = sorted(self.counts, key=lambda item: (-self.counts[item],
+                                                      item))
+        rank = dict((item, i) for i, item in enumerate(order))
+
+        self.root = _FPNode(None, None)
+        self.header = dict((item, []) for item in order)
+        for items, count in transactions:
+            path = sorted(set(item for item in items if item in rank),
+                          key=rank.__getitem__)
+            node = self.root
+            for item in path:
+                try:
+                    node = node.children[item]
+                except KeyError:
+                    child = _FPNode(item, node)
+                    node.children[item] = child
+                    self.header[item].append(child)
+                    node = child
+                node.count += count
+        self._order = order
+
+    def single_path(self):
+        """Get the nodes of the tree if it is a single path, else None."""
+        path = []
+        node = self.root
+        while node.children:
+            if len(node.children) > 1:
+                return None
+            node, = node.children.values()
+            path.append(node)
+        return path
+
+    def conditional_transactions(self, item):
+        """Get the prefix paths of `item`, weighted by its node counts."""
+        transactions = []
+        for node in self.header[item]:
+            path = []
+            parent = node.parent
+            while parent.item is not None:
+                path.append(parent.item)
+                parent = parent.parent
+            if path:
+                transactions.append((path, node.count))
+        return transactions
+
+    def items_ascending(self):
+        return reversed(self._order)
+
+
+def fpgrowth(transactions, min_count, max_length=None, itemsets='all'):
+    """Mine frequent itemsets with the FP-Growth algorithm.
+
+    The transactions are compressed into an FP-tree, which is then mined
+    recursively through conditional trees, without generating candidates.
+
+    For closed itemsets, the items occurring in every transaction of a
+    conditional base are merged into its itemset and left out of its
+    conditional tree, as in CLOSET, and a single path only yields the
+    prefixes at which its count drops. For maximal itemsets, as in FPMax,
+    a single path only yields itself, and a conditional tree is not mined
+    if its itemset with all the items of the tree is a subset of a maximal
+    itemset already found.
+
+    Parameters
+    ----------
+    transactions : Iterable of lists
+        The dataset.
+
+    min_count : int
+        Minimum number of transactions an itemset must occur in. Itemsets
+        which never occur are not reported, even if `min_count` is 0.
+
+    max_length : int
+        Maximum number of items of an itemset(Default None, which means no
+        limit).
+
+    itemsets : str
+        One of 'all', 'closed' or 'maximal'(Default 'all'). `max_length`
+        can only be given with 'all'.
+    """
+    _check_itemsets(itemsets, max_length)
+    min_count = max(min_count, 1)
+    tree = _FPTree([(items, 1) for items in transactions], min_count)
+    if itemsets == 'all':
+        return _mine_tree(tree, (), min_count, max_length)
+    found = _Subsumption(itemsets == 'maximal')
+    _mine_closed_tree(tree, (), min_count, found)
+    return iter(found)
+
+
+def _mine_tree(tree, suffix, min_count, max_length):
+    path = tree.single_path()
+    if path is not None:
+        # Every combination of the nodes of a single path is frequent, with
+        # the count of its deepest node.
+        max_size = len(path)
+        if max_length is not None:
+            max_size = min(max_size, max_length - len(suffix))
+        for size in range(1, max_size + 1):
+            for nodes in combinations(path, size):
+                yield (suffix + tuple(node.item for node in nodes),
+                       nodes[-1].count)
+        return
+
+    for item in tree.items_ascending():
+        itemset = suffix + (item,)
+        yield itemset, tree.counts[item]
+        if len(itemset) == max_length:
+            continue
+        subtree = _FPTree(tree.conditional_transactions(item), min_count)
+        if subtree.counts:
+            for result in _mine_tree(subtree, itemset, min_count, max_length):
+                yield result
+
+
+def _mine_closed_tree(tree, suffix, min_count, found):
+    path = tree.single_path()
+    if path is not None:
+        items = suffix
+        for k, node in enumerate(path):
+            items += (node.item,)
+            last = k + 1 == len(path)
+            if last or (not found.maximal
+                        and path[k + 1].count < node.count):
+                found.add(items, node.count)
+        return
+
+    for item in tree.items_ascending():
+        count = tree.counts[item]
+        transactions = tree.conditional_transactions(item)
+        item_counts = dict()
+        for items, weight in transactions:
+            for other in items:
+                item_counts[other] = item_counts.get(other, 0) + weight
+        # Items in every transaction of the base are in the closure.
+        closure = set(other for other, other_count in item_counts.items()
+                      if other_count == count)
+        itemset = suffix + (item,) + tuple(closure)
+        if found.maximal:
+            tail = [other for other, other_count in item_counts.items()
+                    if other_count >= min_count]
+            if found.covers(itemset + tuple(tail)):
+                continue
+        if closure:
+            transactions = [([other for other in items
+                              if other not in closure], weight)
+                            for items, weight in transactions]
+        subtree = _FPTree(transactions, min_count)
+        if subtree.counts:
+            _mine_closed_tree(subtree, itemset, min_count, found)
+        found.add(itemset, count)
+
+
+def eclat(tidsets, min_count, diffsets=False, max_length=None,
+          itemsets='all'):
+    """Mine frequent itemsets with the Eclat algorithm.
+
+    Itemsets are enumerated depth first, extending a prefix with the items
+    following it, and the support of an extension is found by intersecting
+    the tid-sets of the prefix and the new item. Only the tid-sets along
+    the current path are kept in memory.
+
+    With `diffsets`, the dEclat variant is used. Each extension stores the
+    tids of its prefix which it does *not* contain instead of the ones it
+    does. On dense data these diffsets are much smaller than the tid-sets.
+
+    Closed and maximal itemsets are mined with CHARM, which compares the
+    tid-sets, or diffsets, of two members of a class. If one contains the
+    other, the items of the larger one are merged into the closure of the
+    smaller one, and a member whose tid-set is contained in a previous one
+    is only extended under it. For maximal itemsets, a class is not mined
+    if its prefix with all the items of its members is a subset of a
+    maximal itemset already found, or is frequent itself.
+
+    Parameters
+    ----------
+    tidsets : dict
+        Mapping of every item to a bitset of the transactions containing it.
+
+    min_count : int
+        Minimum number of transactions an itemset must occur in. Itemsets
+        which never occur are not reported, even if `min_count` is 0.
+
+    diffsets : bool
+        Whether to use diffsets instead of tid-sets(Default False).
+
+    max_length : int
+        Maximum number of items of an itemset(Default None, which means no
+        limit).
+
+    itemsets : str
+        One of 'all', 'closed' or 'maximal'(Default 'all'). `max_length`
+        can only be given with 'all'.
+    """
+    _check_itemsets(itemsets, max_length)
+    min_count = max(min_count, 1)
+    members = []
+    for item, tids in tidsets.items():
+        count = popcount(tids)
+        if count >= min_count:
+            members.append((item, tids, count))
+    # Extending the least frequent items first keeps the classes small.
+    members.sort(key=lambda member: (member[2], member[0]))
+    if itemsets != 'all':
+        found = _Subsumption(itemsets == 'maximal')
+        _charm((), [((item,), tids, count) for item, tids, count in members],
+               min_count, found, diffsets, True)
+        return iter(found)
+    if diffsets:
+        return _declat((), members, min_count, True, max_length)
+    return _eclat((), members, min_count, max_length)
+
+
+def _eclat(prefix, members, min_count, max_length):
+    for i, (item, tids, count) in enumerate(members):
+        itemset = prefix + (item,)
+        yield itemset, count
+        if len(itemset) == max_length:
+            continue
+        extensions = []
+        for other, other_tids, _ in members[i + 1:]:
+            new_tids = tids & other_tids
+            new_count = popcount(new_tids)
+            if new_count >= min_count:
+                extensions.append((other, new_tids, new_count))
+        if extensions:
+            for result in _eclat(itemset, extensions, min_count, max_length):
+                yield result
+
+
+def _declat(prefix, members, min_count, tidsets, max_length):
+    # `members` hold tid-sets at the top level and diffsets below it, where
+    # d(PXY) = d(PY) - d(PX) and count(PXY) = count(PX) - |d(PXY)|.
+    for i, (item, bits, count) in enumerate(members):
+        itemset = prefix + (item,)
+        yield itemset, count
+        if len(itemset) == max_length:
+            continue
+        extensions = []
+        for other, other_bits, _ in members[i + 1:]:
+            if tidsets:
+                diff = bits & ~other_bits
+            else:
+                diff = other_bits & ~bits
+            new_count = count - popcount(diff)
+            if new_count >= min_count:
+                extensions.append((other, diff, new_count))
+        if extensions:
+            for result in _declat(itemset, extensions, min_count, False,
+                                  max_length):
+                yield result
+
+
+def _charm(prefix, members, min_count, found, diffsets, tidsets):
+    # `members` hold the items added to `prefix`, and their tid-sets, or
+    # their diffsets below the top level when `diffsets` is set. Either
+    # way, the count of the intersection of the tid-sets of two members
+    # tells whether one contains the other.
+    if found.maximal and members:
+        tail = prefix + tuple(item for items, _, _ in members
+                              for item in items)
+        if found.covers(tail):
+            return
+        # Look ahead: if all the members together are frequent, they are
+        # the only maximal itemset of the class.
+        if diffsets and not tidsets:
+            union = 0
+            for _, bits, _ in members:
+                union |= bits
+            count = members[0][2] + popcount(members[0][1]) - popcount(union)
+        else:
+            union = -1
+            for _, bits, _ in members:
+                union &= bits
+            count = popcount(union)
+        if count >= min_count:
+            found.add(tail, count)
+            return
+
+    removed = set()
+    for i, (items, bits, count) in enumerate(members):
+        if i in removed:
+            continue
+        closure = list(items)
+        extensions = []
+        for j in range(i + 1, len(members)):
+            if j in removed:
+                continue
+            other_items, other_bits, other_count = members[j]
+            if not diffsets:
+                new_bits = bits & other_bits
+                new_count = popcount(new_bits)
+            else:
+                if tidsets:
+                    new_bits = bits & ~other_bits
+                else:
+                    new_bits = other_bits & ~bits
+                new_count = count - popcount(new_bits)
+            if new_count == count:
+                # Every transaction of this member contains the other one.
+                closure.extend(other_items)
+                if new_count == other_count:
+                    removed.add(j)
+            elif new_count == other_count:
+                removed.add(j)
+                extensions.append((other_items, new_bits, new_count))
+            elif new_count >= min_count:
+                extensions.append((other_items, new_bits, new_count))
+        itemset = prefix + tuple(closure)
+        if extensions:
+            _charm(itemset, extensions, min_count, found, diffsets, False)
+        found.add(itemset, count)
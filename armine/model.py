@@ -0,0 +1,321 @@
+"""Binary file format of learned rules.
+
+A model file holds the rules passing the thresholds they were learned at,
+in order, as flat arrays of 64-bit ints: the counts of every rule, and the
+ids of the items of its antecedent and consequent, delimited by arrays of
+offsets. Items and labels are stored once, in a table of strings along
+with the type they are restored to, so that int, float and bool labels,
+such as those of NumPy arrays, can be saved too. Models of classifiers
+also hold the inverted index of their `RuleMatcher`.
+
+Loading a model memory-maps the file, and its arrays are views of the
+mapping, so processes loading the same file share a single copy of the
+rules. A rule object is only built when it is accessed.
+"""
+import mmap
+import struct
+from array import array
+from collections import namedtuple
+from io import open
+
+from .rule import AssociationRule, ClassificationRule
+
+MODEL_ARM = 0
+MODEL_CLASSIFIER = 1
+
+_MAGIC = b'ARMINE\x00\x02'
+# Files without the types of their strings, which are all str.
+_MAGIC_V1 = b'ARMINE\x00\x01'
+# Magic, byte order check, kind, whether the database is transactional,
+# datasize, id of the default class, support, confidence and coverage
+# thresholds.
+_HEADER = struct.Struct('=8sqqqqqddd')
+_SECTION_SIZE = struct.Struct('=q')
+_BYTE_ORDER_CHECK = 0x0102030405060708
+
+ModelInfo = namedtuple('ModelInfo', ['kind', 'datasize', 'support_threshold',
+                                     'confidence_threshold',
+                                     'coverage_threshold', 'default_class',
+                                     'transactional_database'])
+
+
+def _to_bytes(values):
+    try:
+        values = array('q', values)
+    except ValueError:
+        # Python 2, whose arrays have no 64-bit type
+        values = list(values)
+        return struct.pack('={}q'.format(len(values)), *values)
+    return values.tobytes()
+
+
+# Types of the values of the table of strings.
+_STR, _INT, _FLOAT, _BOOL = range(4)
+_DECODERS = {
+    _STR: lambda string: string,
+    _INT: int,
+    _FLOAT: float,
+    _BOOL: lambda string: string == 'True',
+}
+
+
+def _cast(view):
+    try:
+        return view.cast('q')
+    except AttributeError:
+        # Python 2
+        data = view.tobytes()
+        return struct.unpack('={}q'.format(len(data) // 8), data)
+
+
+def _get_type(value):
+    if isinstance(value, bool):
+        return _BOOL
+    if isinstance(value, float):
+        return _FLOAT
+    if isinstance(value, type(u'')):
+        return _STR
+    try:
+        value.decode('utf-8')
+        return _STR
+    except AttributeError:
+        pass
+    if isinstance(value, int) or type(value).__name__ == 'long':
+        return _INT
+    return None
+
+
+class _StringTable(object):
+    def __init__(self):
+        self.strings = []
+        self.types = []
+        self._ids = dict()
+
+    def get_id(self, string):
+        value_type = _get_type(string)
+        if value_type is None and hasattr(string, 'item'):
+            # A NumPy scalar.
+            string = string.item()
+            value_type = _get_type(string)
+        if value_type is None:
+            raise TypeError("Only str, int, float and bool items and labels "
+                            "can be saved, got {!r}".format(string))
+        # 1, 1.0 and True are equal, but are restored differently.
+        key = (value_type, string)
+        try:
+            return self._ids[key]
+        except KeyError:
+            pass
+        self._ids[key] = len(self.strings)
+        self.strings.append(string)
+        self.types.append(value_type)
+        return self._ids[key]
+
+    def get_ids(self, strings):
+        return [self.get_id(string) for string in strings]
+
+    def encode(self):
+        """Get the offsets and the concatenated utf-8 bytes of the
+        strings."""
+        offsets = [0]
+        data = []
+        for string, value_type in zip(self.strings, self.types):
+            if value_type == _FLOAT:
+                string = repr(string)
+            elif value_type != _STR:
+                string = str(string)
+            if isinstance(string, type(u'')):
+                string = string.encode('utf-8')
+            data.append(string)
+            offsets.append(offsets[-1] + len(string))
+        return _to_bytes(offsets), b''.join(data), _to_bytes(self.types)
+
+
+def _write_section(stream, data):
+    stream.write(_SECTION_SIZE.pack(len(data)))
+    stream.write(data)
+    stream.write(b'\x00' * (-len(data) % 8))
+
+
+def save_model(filename, info, rules, matcher=None):
+    """Write `rules` to a model file.
+
+    Parameters
+    ----------
+    filename : string
+        Name of the model file.
+
+    info : ModelInfo
+        Properties of the model. `default_class` is a label or None.
+
+    rules : list of AssociationRule
+        Rules of the model, in order.
+
+    matcher : RuleMatcher
+        Index of `rules` saved along with them(Default None).
+    """
+    strings = _StringTable()
+    antecedent_offsets = [0]
+    antecedents = []
+    consequent_offsets = [0]
+    consequents = []
+    for rule in rules:
+        antecedents.extend(strings.get_ids(rule.antecedent))
+        antecedent_offsets.append(len(antecedents))
+        if info.kind == MODEL_CLASSIFIER:
+            consequents.append(strings.get_id(rule.consequent))
+        else:
+            consequents.extend(strings.get_ids(rule.consequent))
+        consequent_offsets.append(len(consequents))
+
+    sections = [
+        _to_bytes(rule._count_both for rule in rules),
+        _to_bytes(rule._count_lhs for rule in rules),
+        _to_bytes(rule._count_rhs for rule in rules),
+        _to_bytes(antecedent_offsets), _to_bytes(antecedents),
+        _to_bytes(consequent_offsets), _to_bytes(consequents),
+    ]
+    if matcher is not None:
+        posting_items = sorted(matcher._postings)
+        posting_offsets = [0]
+        postings = []
+        for item in posting_items:
+            postings.extend(matcher._postings[item])
+            posting_offsets.append(len(postings))
+        sections.extend([_to_bytes(matcher._sizes),
+                         _to_bytes(matcher._always),
+                         _to_bytes(strings.get_ids(posting_items)),
+                         _to_bytes(posting_offsets), _to_bytes(postings)])
+
+    default_class = -1
+    if info.default_class is not None:
+        default_class = strings.get_id(info.default_class)
+    header = _HEADER.pack(_MAGIC, _BYTE_ORDER_CHECK, info.kind,
+                          int(info.transactional_database), info.datasize,
+                          default_class, info.support_threshold,
+                          info.confidence_threshold, info.coverage_threshold)
+    with open(filename, 'wb') as stream:
+        stream.write(header)
+        for section in strings.encode():
+            _write_section(stream, section)
+        for section in sections:
+            _write_section(stream, section)
+
+
+class CompiledModel(object):
+    """A model file, memory-mapped for reading.
+
+    Parameters
+    ----------
+    filename : string
+        Name of the model file, as written by `save_model`.
+    """
+    def __init__(self, filename):
+        with open(filename, 'rb') as stream:
+            self._mmap = mmap.mmap(stream.fileno(), 0,
+                                   access=mmap.ACCESS_READ)
+        buf = self._mmap
+        magic = buf[:len(_MAGIC)]
+        if len(buf) < _HEADER.size or magic not in (_MAGIC, _MAGIC_V1):
+            raise ValueError("'{}' is not an armine model file"
+                             .format(filename))
+        header = _HEADER.unpack_from(buf)
+        if header[1] != _BYTE_ORDER_CHECK:
+            raise ValueError("'{}' was saved on a machine with a different "
+                             "byte order".format(filename))
+
+        sections = []
+        pos = _HEADER.size
+        view = memoryview(buf)
+        while pos < len(buf):
+            size, = _SECTION_SIZE.unpack_from(buf, pos)
+            pos += _SECTION_SIZE.size
+            sections.append(view[pos:pos + size])
+            pos += size + (-size % 8)
+
+        string_offsets = _cast(sections[0])
+        data = sections[1].tobytes()
+        self.strings = [data[string_offsets[i]:string_offsets[i + 1]]
+                        .decode('utf-8')
+                        for i in range(len(string_offsets) - 1)]
+        if magic == _MAGIC:
+            types = _cast(sections.pop(2))
+            self.strings = [_DECODERS[types[i]](string)
+                            for i, string in enumerate(self.strings)]
+        (self.count_both, self.count_lhs, self.count_rhs,
+         self.antecedent_offsets, self.antecedents,
+         self.consequent_offsets, self.consequents) = [
+             _cast(section) for section in sections[2:9]]
+        self._matcher_sections = [_cast(section)
+                                  for section in sections[9:14]]
+
+        kind, transactional, datasize, default_class = header[2:6]
+        self.info = ModelInfo(
+            kind, datasize, header[6], header[7], header[8],
+            None if default_class < 0 else self.strings[default_class],
+            bool(transactional))
+
+    @property
+    def rules(self):
+        return CompiledRules(self)
+
+    @property
+    def matcher_index(self):
+        """Get the sizes, postings and rules with an empty antecedent of
+        the saved `RuleMatcher`, or None if it was not saved."""
+        if not self._matcher_sections:
+            return None
+        (sizes, always, posting_items, posting_offsets,
+         postings) = self._matcher_sections
+        postings = dict((self.strings[item],
+                         postings[posting_offsets[i]:posting_offsets[i + 1]])
+                        for i, item in enumerate(posting_items))
+        return sizes, postings, always
+
+
+class CompiledRules(object):
+    """Read-only sequence of the rules of a `CompiledModel`.
+
+    A rule is built from the arrays of the model every time it is accessed.
+    """
+    def __init__(self, model):
+        self._model = model
+
+    def __len__(self):
+        return len(self._model.count_both)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self._get_rule(index)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._get_rule(i)
+                    for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("rule index out of range")
+        return self._get_rule(index)
+
+    def count_column(self, name):
+        """Get the array of the counts `name` of the rules, one of
+        'count_both', 'count_lhs' and 'count_rhs'."""
+        return getattr(self._model, name)
+
+    def _get_rule(self, index):
+        model = self._model
+        strings = model.strings
+        start, end = model.antecedent_offsets[index:index + 2]
+        antecedent = tuple(strings[i] for i in model.antecedents[start:end])
+        start, end = model.consequent_offsets[index:index + 2]
+        consequent = [strings[i] for i in model.consequents[start:end]]
+        if model.info.kind == MODEL_CLASSIFIER:
+            rule_class = ClassificationRule
+            consequent = consequent[0]
+        else:
+            rule_class = AssociationRule
+            consequent = tuple(consequent)
+        return rule_class(antecedent, consequent, model.count_both[index],
+                          model.count_lhs[index], model.count_rhs[index],
+                          model.info.datasize)
@@ -0,0 +1,81 @@
+"""Support counting spread over a pool of worker processes."""
+from multiprocessing import Pool, cpu_count
+
+from .utils import popcount
+
+# Vertical index of the dataset, installed once in every worker process.
+_worker_index = {}
+
+
+def _init_worker(item_bitsets, full_bitset, masks):
+    _worker_index['item_bitsets'] = item_bitsets
+    _worker_index['full_bitset'] = full_bitset
+    _worker_index['masks'] = masks
+
+
+def _count_shard(itemset):
+    item_bitsets = _worker_index['item_bitsets']
+    masks = _worker_index['masks']
+    counts = []
+    prefix = None
+    prefix_bitset = _worker_index['full_bitset']
+    for ids in itemset:
+        if ids[:-1] != prefix:
+            prefix = ids[:-1]
+            prefix_bitset = _worker_index['full_bitset']
+            for i in prefix:
+                prefix_bitset &= item_bitsets[i]
+        bitset = prefix_bitset & item_bitsets[ids[-1]]
+        counts.append(tuple(popcount(bitset & mask) for mask in masks))
+    return counts
+
+
+def get_n_jobs(n_jobs):
+    """Resolve `n_jobs`, where negative values count back from the number
+    of CPUs, so -1 means all of them."""
+    if n_jobs is None:
+        return 1
+    if n_jobs < 0:
+        return max(1, cpu_count() + 1 + n_jobs)
+    return max(1, n_jobs)
+
+
+class CountingPool(object):
+    """Pool of processes counting the supports of candidate itemsets.
+
+    Every worker receives the vertical index once, when the pool starts.
+    Candidates are then split into contiguous shards, so that itemsets
+    sharing a prefix mostly stay together, and each worker returns the
+    popcount of every candidate's bitset ANDed with each of `masks`.
+
+    Parameters
+    ----------
+    n_jobs : int
+        Number of worker processes.
+
+    item_bitsets : list of int
+        Bitset of every item id.
+
+    full_bitset : int
+        Bitset with a bit set for every transaction.
+
+    masks : list of int
+        Bitsets the counts are restricted to.
+    """
+    def __init__(self, n_jobs, item_bitsets, full_bitset, masks):
+        self.n_jobs = n_jobs
+        self._pool = Pool(n_jobs, _init_worker,
+                          (item_bitsets, full_bitset, masks))
+
+    def count(self, itemset):
+        n_shards = self.n_jobs * 4
+        size = max(1, -(-len(itemset) // n_shards))
+        shards = [itemset[i:i + size] for i in range(0, len(itemset), size)]
+        counts = []
+        for shard_counts in self._pool.map(_count_shard, shards):
+            counts.extend(shard_counts)
+        return counts
+
+    def close(self):
+        self._pool.close()
+        self._pool.join()
@@ -0,0 +1,270 @@
+from operator import itemgetter
+from threading import Lock
+
+from .matrix import (onehot_bitsets, categorical_bitsets, _is_dataframe,
+                     _is_sparse)
+from .utils import _int_to_bytes, bitset_from_indices, indices_from_bitset
+
+
+class Predictor(object):
+    """Immutable classifier made of the rules of a trained ARMClassifier.
+
+    A predictor only reads the index of its rules, which is never modified,
+    so it can be shared by any number of threads. Learning again with the
+    ARMClassifier it came from does not affect it. Get one using
+    `ARMClassifier.predictor`.
+
+    Parameters
+    ----------
+    matcher : RuleMatcher
+        Index of the rules, sorted by priority.
+
+    default_class : object
+        Label predicted when no rule matches.
+
+    transactional_database : bool
+        Whether the rules were learned from a transactional database, see
+        `ARMClassifier.load`(Default True).
+    """
+    __slots__ = ('_matcher', '_default_class', '_transactional_database')
+
+    def __init__(self, matcher, default_class, transactional_database=True):
+        object.__setattr__(self, '_matcher', matcher)
+        object.__setattr__(self, '_default_class', default_class)
+        object.__setattr__(self, '_transactional_database',
+                           transactional_database)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Predictor objects are immutable")
+
+    def __len__(self):
+        return len(self._matcher)
+
+    @property
+    def default_class(self):
+        return self._default_class
+
+    def classify(self, data_instance, top_k_rules=25):
+        """Classify `data_instance`. See `ARMClassifier.classify`."""
+        matching_rules = self._matcher.match(data_instance, top_k_rules)
+        if len(matching_rules) > 0:
+            score = dict()
+            for rule in matching_rules:
+                label = rule.consequent
+                score[label] = (score.get(label, 0) + rule.lift)
+            return max(score.items(), key=itemgetter(1))[0]
+        else:
+            return self._default_class
+
+    def classify_many(self, data_instances, top_k_rules=25):
+        """Classify every instance of `data_instances`, as `classify` does.
+
+        The whole batch is matched against the rules at once, see
+        `RuleMatcher.match_bitsets`, so a rule is only looked at once per
+        batch rather than once per instance.
+
+        Returns
+        -------
+        list
+            Predicted label of every instance.
+        """
+        data_instances = list(data_instances)
+        size = len(data_instances)
+        scores = [None] * size
+        matches = self._matcher.match_bitsets(
+            _item_bitsets(data_instances), size, top_k_rules)
+        for rule, rows in self._get_rules(matches):
+            label = rule.consequent
+            lift = rule.lift
+            for row in indices_from_bitset(rows):
+                score = scores[row]
+                if score is None:
+                    score = scores[row] = dict()
+                score[label] = score.get(label, 0) + lift
+        return [self._default_class if score is None
+                else max(score.items(), key=itemgetter(1))[0]
+                for score in scores]
+
+    def predict(self, data, top_k_rules=25, items=None, return_scores=False):
+        """Classify a batch of data instances, with NumPy.
+
+        Parameters
+        ----------
+        data : 2-D array_like, scipy.sparse matrix, pandas.DataFrame or list
+            One-hot matrix whose nonzero entries mark the items of every
+            data instance, or a list of data instances. If the rules were
+            learned from a non transactional database, a matrix holds the
+            value of every feature instead, as with
+            `ARMClassifier.load_dataframe`, and missing values are left out.
+
+        top_k_rules : int
+            Maximum number of rules used to classify a data instance
+            (Default 25).
+
+        items : list
+            Item of every column of a one-hot matrix(Default None, which uses
+            the columns of a DataFrame, and the column indices otherwise).
+
+        return_scores : bool
+            Whether to also return the scores of the labels(Default False).
+
+        Returns
+        -------
+        numpy.ndarray
+            Predicted label of every data instance.
+
+        numpy.ndarray
+            Only if `return_scores`, the sum of the lifts of the matched
+            rules of every label, with a row per data instance.
+
+        list
+            Only if `return_scores`, the label of every column of the
+            scores. Labels without a matched rule are left out.
+        """
+        import numpy as np
+        item_bitsets, size = self._get_item_bitsets(data, items)
+        classes = []
+        columns = dict()
+        scores = []
+        # Priority of the first matched rule of every label, to break ties
+        # as `classify` does.
+        firsts = []
+        matches = self._matcher.match_bitsets(item_bitsets, size,
+                                              top_k_rules)
+        for priority, (rule, rows) in enumerate(self._get_rules(matches)):
+            rows = _unpack(rows, size)
+            label = rule.consequent
+            if label not in columns:
+                columns[label] = len(classes)
+                classes.append(label)
+                scores.append(np.zeros(size))
+                firsts.append(np.full(size, np.inf))
+            column = columns[label]
+            scores[column][rows] += rule.lift
+            first = firsts[column]
+            first[rows & np.isinf(first)] = priority
+
+        scores = np.array(scores).reshape(len(classes), size).T
+        firsts = np.array(firsts).reshape(len(classes), size).T
+        labels = np.empty(size, dtype=object)
+        labels[:] = [self._default_class] * size
+        if classes:
+            best = scores == scores.max(axis=1)[:, np.newaxis]
+            choice = np.where(best, firsts, np.inf).argmin(axis=1)
+            matched = np.isfinite(firsts).any(axis=1)
+            labels[matched] = np.array(classes, dtype=object)[
+                choice[matched]]
+        if return_scores:
+            return labels, scores, classes
+        return labels
+
+    def _get_item_bitsets(self, data, items):
+        """Get the bitset of the rows containing every item of `data`, and
+        its number of rows."""
+        if not hasattr(data, 'shape'):
+            data = list(data)
+            return _item_bitsets(data), len(data)
+        if self._transactional_database:
+            return dict(onehot_bitsets(data, items)), data.shape[0]
+        if _is_dataframe(data):
+            # Rules refer to the values of the features, whichever column
+            # they come from.
+            item_bitsets = dict()
+            for _, value, bitset in categorical_bitsets(data):
+                item_bitsets[value] = item_bitsets.get(value, 0) | bitset
+            return item_bitsets, len(data)
+        if _is_sparse(data):
+            raise ValueError("Expected the values of the features, got a "
+                             "sparse matrix")
+        data = data.tolist()
+        return _item_bitsets(data), len(data)
+
+    def _get_rules(self, matches):
+        rules = self._matcher.rules
+        for rule_id, rows in matches:
+            yield rules[rule_id], rows
+
+    def classify_async(self, data_instances, top_k_rules=25, executor=None):
+        """Classify `data_instances` in an executor, without blocking the
+        asyncio event loop. It must be called from the event loop.
+
+        Parameters
+        ----------
+        executor : concurrent.futures.Executor
+            Executor running the classification(Default None, which uses
+            the default executor of the loop).
+
+        Returns
+        -------
+        asyncio.Future
+            Future of the list returned by `classify_many`.
+        """
+        import asyncio
+        loop = asyncio.get_event_loop()
+        return loop.run_in_executor(executor, self.classify_many,
+                                    data_instances, top_k_rules)
+
+
+def _item_bitsets(data_instances):
+    """Get the bitset of the rows containing every item."""
+    indices = dict()
+    for row, data_instance in enumerate(data_instances):
+        for item in set(data_instance):
+            indices.setdefault(item, []).append(row)
+    size = len(data_instances)
+    return dict((item, bitset_from_indices(rows, size))
+                for item, rows in indices.items())
+
+
+def _unpack(bitset, size):
+    """Get a boolean NumPy array of the first `size` bits of `bitset`."""
+    import numpy as np
+    buf = np.frombuffer(_int_to_bytes(bitset), dtype=np.uint8)
+    return np.unpackbits(buf, count=size, bitorder='little').astype(bool)
+
+
+class AtomicPredictor(object):
+    """Reference to a Predictor which can be replaced while serving.
+
+    Every call reads the reference once, so each request is served
+    entirely by either the old or the new predictor, and a newly trained
+    model can be swapped in without stopping the threads using it.
+
+    Parameters
+    ----------
+    predictor : Predictor
+        The initial predictor.
+    """
+    def __init__(self, predictor):
+        self._predictor = predictor
+        self._lock = Lock()
+
+    def get(self):
+        """Get the current predictor."""
+        return self._predictor
+
+    def swap(self, predictor):
+        """Replace the current predictor with `predictor`.
+
+        Returns
+        -------
+        Predictor
+            The replaced predictor.
+        """
+        with self._lock:
+            old, self._predictor = self._predictor, predictor
+        return old
+
+    def classify(self, data_instance, top_k_rules=25):
+        return self._predictor.classify(data_instance, top_k_rules)
+
+    def classify_many(self, data_instances, top_k_rules=25):
+        return self._predictor.classify_many(data_instances, top_k_rules)
+
+    def predict(self, data, top_k_rules=25, items=None, return_scores=False):
+        return self._predictor.predict(data, top_k_rules, items,
+                                       return_scores)
+
+    def classify_async(self, data_instances, top_k_rules=25, executor=None):
+        return self._predictor.classify_async(data_instances, top_k_rules,
+                                              executor)
@@ -15,7 +15,33 @@ def on_zero_error(default_value):
     return decorator
 
 
+@on_zero_error(0)
+def _confidence(count_both, count_lhs):
+    return count_both / count_lhs
+
+
+@on_zero_error(1)
+def _lift(count_both, count_lhs, count_rhs, datasize):
+    return (datasize * count_both) / (count_lhs * count_rhs)
+
+
+@on_zero_error(1)
+def _conviction(count_rhs, datasize, confidence):
+    return (1 - (count_rhs / datasize)) / (1 - confidence)
+
+
 class AssociationRule(object):
+    """A rule `antecedent ==> consequent` along with its counts.
+
+    Rules are compact, as millions of them may be generated. They have no
+    per instance `__dict__`, and the metrics used for filtering and sorting
+    rules are computed once when the rule is created.
+    """
+    __slots__ = ('_antecedent', '_consequent', '_count_both', '_count_lhs',
+                 '_count_rhs', '_datasize', '_antecedent_set', '_hash',
+                 '_support', '_coverage', '_confidence', '_lift',
+                 '_leverage', '_conviction')
+
     def __init__(self, antecedent, consequent, count_both,
                  count_lhs, count_rhs, datasize):
         self._count_lhs = count_lhs
@@ -24,6 +50,16 @@ class AssociationRule(object):
         self._datasize = datasize
         self._antecedent = antecedent
         self._consequent = consequent
+        self._antecedent_set = frozenset(antecedent)
+        self._hash = (hash(antecedent) + hash(consequent) + hash(count_lhs)
+                      + hash(count_both) + hash(count_rhs) + hash(datasize))
+
+        self._support = count_both / datasize
+        self._coverage = count_lhs / datasize
+        self._confidence = _confidence(count_both, count_lhs)
+        self._lift = _lift(count_both, count_lhs, count_rhs, datasize)
+        self._leverage = datasize * count_both - count_lhs * count_rhs
+        self._conviction = _conviction(count_rhs, datasize, self._confidence)
 
     def __eq__(self, other):
         return (self._antecedent == other._antecedent
@@ -34,12 +70,7 @@ class AssociationRule(object):
                 and self._datasize == other._datasize)
 
     def __hash__(self):
-        return (hash(self._antecedent)
-                + hash(self._consequent)
-                + hash(self._count_lhs)
-                + hash(self._count_both)
-                + hash(self._count_rhs)
-                + hash(self._datasize))
+        return self._hash
 
     def __str__(self):
         lhs = ', '.join(self._antecedent)
@@ -57,40 +88,35 @@ class AssociationRule(object):
 
     @property
     def support(self):
-        return self._count_both / self._datasize
+        return self._support
 
     @property
     def coverage(self):
-        return self._count_lhs / self._datasize
+        return self._coverage
 
     @property
     def strength(self):
         return self._count_rhs / self._count_lhs
 
     @property
-    @on_zero_error(0)
     def confidence(self):
-        return self._count_both / self._count_lhs
+        return self._confidence
 
     @property
     def confidence_expected(self):
         return self._count_rhs / self._datasize
 
     @property
-    @on_zero_error(1)
     def lift(self):
-        return ((self._datasize * self._count_both)
-                / (self._count_lhs * self._count_rhs))
+        return self._lift
 
     @property
     def leverage(self):
-        return ((self._datasize * self._count_both)
-                - (self._count_lhs * self._count_rhs))
+        return self._leverage
 
     @property
-    @on_zero_error(1)
     def conviction(self):
-        return (1 - (self._count_rhs / self._datasize)) / (1 - self.confidence)
+        return self._conviction
 
     @property
     def cosine(self):
@@ -103,7 +129,7 @@ class AssociationRule(object):
     # ******************** Properties end here ****************************** #
 
     def match_antecedent(self, items):
-        return set(self._antecedent).issubset(items)
+        return self._antecedent_set.issubset(items)
 
     def antecedent2str(self):
         return ', '.join(self._antecedent)
@@ -116,6 +142,7 @@ class AssociationRule(object):
 
 
 class ClassificationRule(AssociationRule):
+    __slots__ = ()
 
     def __str__(self):
         lhs = ', '.join(self._antecedent)
@@ -0,0 +1,327 @@
+from array import array
+from bisect import bisect_right
+from heapq import nlargest, nsmallest
+from math import sqrt
+
+
+def _import_numpy():
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+def _cosine(rule):
+    try:
+        return rule._count_both / sqrt(rule._count_lhs * rule._count_rhs)
+    except ZeroDivisionError:
+        return 0.0
+
+
+class RuleTable(object):
+    """Columnar table of rules for filtering and sorting by any metric.
+
+    The counts and metrics of the rules are stored column-wise in typed
+    arrays, built once. Filtering, sorting and top-N queries only touch the
+    columns involved and return views, which share the columns and hold an
+    array of row positions, instead of new lists of rules.
+
+    If NumPy is installed, the columns are NumPy arrays and queries are
+    vectorized. Otherwise they are `array.array` columns, scanned and
+    sorted in Python.
+
+    Parameters
+    ----------
+    rules : list of AssociationRule or CompiledRules
+        Rules of the table. Their order is the order of the table. The
+        counts of compiled rules are read from the arrays of their model.
+    """
+    COUNT_COLUMNS = ('count_both', 'count_lhs', 'count_rhs')
+    METRIC_COLUMNS = ('support', 'coverage', 'confidence', 'lift',
+                      'leverage', 'conviction', 'cosine')
+
+    # Whether to use NumPy columns when it is installed.
+    _USE_NUMPY = True
+
+    def __init__(self, rules, _columns=None, _positions=None):
+        self._rules = rules
+        if _columns is None:
+            np = _import_numpy() if self._USE_NUMPY else None
+            _columns = dict()
+            compiled = hasattr(rules, 'count_column')
+            for name in self.COUNT_COLUMNS:
+                if compiled:
+                    # The mapped array of the model, which is not copied.
+                    values = rules.count_column(name)
+                    if np is not None:
+                        values = np.asarray(values, dtype=np.int64)
+                    _columns[name] = values
+                    continue
+                values = (getattr(rule, '_' + name) for rule in rules)
+                if np is None:
+                    _columns[name] = array('l', values)
+                else:
+                    _columns[name] = np.fromiter(values, dtype=np.int64,
+                                                 count=len(rules))
+            # Compiled rules are built on access, so they are built once
+            # for all the metrics.
+            built = list(rules) if compiled else rules
+            metrics = [(name, lambda rule, name=name: getattr(rule, name))
+                       for name in self.METRIC_COLUMNS[:-1]]
+            metrics.append(('cosine', _cosine))
+            for name, metric in metrics:
+                values = (metric(rule) for rule in built)
+                if np is None:
+                    _columns[name] = array('d', values)
+                else:
+                    _columns[name] = np.fromiter(values, dtype=np.float64,
+                                                 count=len(rules))
+            if np is None:
+                _positions = array('l', range(len(rules)))
+            else:
+                _positions = np.arange(len(rules))
+        self._columns = _columns
+        self._positions = _positions
+        # The module of the columns, or None for `array` columns.
+        self._np = None if isinstance(_positions, array) else _import_numpy()
+
+    def _view(self, positions):
+        if self._np is None:
+            positions = array('l', positions)
+        elif not isinstance(positions, self._np.ndarray):
+            positions = self._np.fromiter(positions, dtype=self._np.intp)
+        return type(self)(self._rules, self._columns, positions)
+
+    def __len__(self):
+        return len(self._positions)
+
+    def __iter__(self):
+        rules = self._rules
+        for position in self._positions.tolist():
+            yield rules[position]
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return self._view(self._positions[key])
+        return self._rules[int(self._positions[key])]
+
+    @property
+    def columns(self):
+        return self.COUNT_COLUMNS + self.METRIC_COLUMNS
+
+    def column(self, name):
+        """Get the values of the column `name` for the rows of the view."""
+        column = self._columns[name]
+        if self._np is not None:
+            return column[self._positions].tolist()
+        return [column[position] for position in self._positions]
+
+    def tolist(self):
+        """Get the rules of the view as a list."""
+        return list(self)
+
+    def filter(self, **minimums):
+        """Get the rows whose columns are at least the given values.
+
+        Parameters
+        ----------
+        **minimums
+            Minimum value of a column, by column name. A value of None
+            does not filter the column.
+
+        Examples
+        --------
+        >>> table.filter(support=0.2, lift=1.5)
+        """
+        positions = self._positions
+        for name, minimum in minimums.items():
+            if minimum is None:
+                continue
+            column = self._columns[name]
+            if self._np is not None:
+                positions = positions[column[positions] >= minimum]
+            else:
+                positions = [position for position in positions
+                             if column[position] >= minimum]
+        return self._view(positions)
+
+    def sort(self, by=('lift', 'confidence'), reverse=True):
+        """Get the rows sorted on one or more columns.
+
+        Parameters
+        ----------
+        by : str or tuple of str
+            Column, or columns in order of precedence, to sort on
+            (Default ('lift', 'confidence')).
+
+        reverse : bool
+            Whether to sort in descending order(Default True).
+        """
+        if isinstance(by, str):
+            by = (by,)
+        if self._np is not None:
+            # lexsort is stable, and its last key is the most significant.
+            sign = -1 if reverse else 1
+            keys = [sign * self._columns[name][self._positions]
+                    for name in reversed(by)]
+            return self._view(self._positions[self._np.lexsort(keys)])
+        positions = list(self._positions)
+        # Stable sorts, from the least significant column to the most.
+        for name in reversed(by):
+            positions.sort(key=self._columns[name].__getitem__,
+                           reverse=reverse)
+        return self._view(positions)
+
+    def top(self, n, by='lift', reverse=True):
+        """Get the `n` rows with the largest values of a column.
+
+        Parameters
+        ----------
+        n : int
+            Number of rows.
+
+        by : str
+            Column to rank the rows on(Default 'lift').
+
+        reverse : bool
+            Whether to get the largest values, or the smallest(Default
+            True).
+        """
+        if self._np is not None:
+            values = self._columns[by][self._positions]
+            if reverse:
+                values = -values
+            # A stable sort keeps the first of equal rows, as nlargest does.
+            order = self._np.argsort(values, kind='stable')[:max(n, 0)]
+            return self._view(self._positions[order])
+        select = nlargest if reverse else nsmallest
+        return self._view(select(n, self._positions,
+                                 key=self._columns[by].__getitem__))
+
+    def threshold_index(self, x='coverage', y='confidence'):
+        """Get an index to query the rows passing thresholds on two
+        columns, see `ThresholdIndex`."""
+        return ThresholdIndex(self, x, y)
+
+
+class ThresholdIndex(object):
+    """Index of the rows of a RuleTable on two columns, to find the rows
+    whose values are at least `x_min` and `y_min` without scanning them.
+
+    The rows are ordered by decreasing `x`, so that the rows passing
+    `x_min` are a prefix found by bisection. On top of that order, a merge
+    sort tree is built: at every level, aligned blocks of rows are sorted by
+    decreasing `y`. A prefix is covered by at most one block per level, in
+    each of which the rows passing `y_min` are again found by bisection and
+    sliced. A query costs O(log^2 n) plus the size of its result, which is
+    returned in the order of the table.
+
+    Parameters
+    ----------
+    table : RuleTable
+        Table to index.
+
+    x, y : str
+        Names of the indexed columns.
+    """
+    # Blocks smaller than this are scanned instead of being indexed.
+    MIN_BLOCK_SIZE = 32
+
+    def __init__(self, table, x, y):
+        self._table = table
+        self._last_query = None
+        np = table._np
+        if np is not None:
+            self._build_numpy(np, table._columns[x][table._positions],
+                              table._columns[y][table._positions])
+            return
+        x_column = table._columns[x]
+        y_column = table._columns[y]
+        self._xs = array('d', (x_column[p] for p in table._positions))
+        self._ys = array('d', (y_column[p] for p in table._positions))
+        size = len(self._xs)
+
+        self._order = array('l', sorted(range(size),
+                                        key=self._xs.__getitem__,
+                                        reverse=True))
+        self._neg_xs = array('d', (-self._xs[row] for row in self._order))
+
+        # levels[i] holds the rows and negated y values of the blocks of
+        # size `MIN_BLOCK_SIZE << i`, each sorted by increasing -y.
+        self._levels = []
+        block_size = self.MIN_BLOCK_SIZE
+        while block_size <= size:
+            rows = array('l')
+            for start in range(0, size, block_size):
+                block = self._order[start:start + block_size]
+                rows.extend(sorted(block, key=self._ys.__getitem__,
+                                   reverse=True))
+            neg_ys = array('d', (-self._ys[row] for row in rows))
+            self._levels.append((block_size, rows, neg_ys))
+            block_size *= 2
+
+    def _build_numpy(self, np, xs, ys):
+        # Stable sorts on negated values, as the sorts with `reverse` are.
+        self._xs = xs
+        self._ys = ys
+        size = len(xs)
+        self._order = np.argsort(-xs, kind='stable')
+        self._neg_xs = -xs[self._order]
+        self._levels = []
+        block_size = self.MIN_BLOCK_SIZE
+        blocks = np.arange(size)
+        while block_size <= size:
+            rows = self._order[np.lexsort((-ys[self._order],
+                                           blocks // block_size))]
+            self._levels.append((block_size, rows, -ys[rows]))
+            block_size *= 2
+
+    def query(self, x_min=None, y_min=None):
+        """Get a view of the rows with `x >= x_min` and `y >= y_min`.
+
+        A minimum of None does not filter the column.
+        """
+        key = (x_min, y_min)
+        if self._last_query is not None and self._last_query[0] == key:
+            return self._last_query[1]
+        x_min = float('-inf') if x_min is None else x_min
+        y_min = float('-inf') if y_min is None else y_min
+
+        if self._table._np is not None:
+            view = self._query_numpy(self._table._np, x_min, y_min)
+            self._last_query = (key, view)
+            return view
+
+        end = bisect_right(self._neg_xs, -x_min)
+        result = []
+        start = 0
+        for block_size, rows, neg_ys in reversed(self._levels):
+            if start + block_size <= end:
+                stop = bisect_right(neg_ys, -y_min, start, start + block_size)
+                result.extend(rows[start:stop])
+                start += block_size
+        ys = self._ys
+        result.extend(row for row in self._order[start:end]
+                      if ys[row] >= y_min)
+        result.sort()
+
+        positions = self._table._positions
+        view = self._table._view(positions[row] for row in result)
+        self._last_query = (key, view)
+        return view
+
+    def _query_numpy(self, np, x_min, y_min):
+        end = np.searchsorted(self._neg_xs, -x_min, side='right')
+        result = []
+        start = 0
+        for block_size, rows, neg_ys in reversed(self._levels):
+            if start + block_size <= end:
+                stop = start + np.searchsorted(
+                    neg_ys[start:start + block_size], -y_min, side='right')
+                result.append(rows[start:stop])
+                start += block_size
+        rest = self._order[start:end]
+        result.append(rest[self._ys[rest] >= y_min])
+        result = np.sort(np.concatenate(result))
+        return self._table._view(self._table._positions[result])
@@ -1,5 +1,221 @@
+from binascii import hexlify, unhexlify
+from collections import OrderedDict, namedtuple
 from itertools import chain, combinations
 
+try:
+    # Python 3.10+
+    popcount = int.bit_count
+except AttributeError:
+    def popcount(bitset):
+        return bin(bitset).count('1')
+
 
 def get_subsets(arr):
     return chain(*[combinations(arr, i+1) for i in range(len(arr))])
+
+
+def item_key(item):
+    """Sort key of an item. Items of different types are ordered by the
+    name of their type, so that ints, strings and tuples of them can be
+    sorted together."""
+    if isinstance(item, tuple):
+        return ('tuple', tuple(item_key(value) for value in item))
+    return (type(item).__name__, item)
+
+
+def _bytes_to_int(buf):
+    try:
+        return int.from_bytes(bytes(buf), 'little')
+    except AttributeError:
+        # Python 2
+        return int(hexlify(bytes(buf[::-1])) or '0', 16)
+
+
+def _int_to_bytes(value):
+    size = (value.bit_length() + 7) // 8
+    try:
+        return value.to_bytes(size, 'little')
+    except AttributeError:
+        # Python 2
+        return unhexlify('{:0{}x}'.format(value, 2 * size))[::-1]
+
+
+def indices_from_bitset(bitset):
+    """Iterate over the indices of the bits set in `bitset`, in increasing
+    order."""
+    for k, byte in enumerate(bytearray(_int_to_bytes(bitset))):
+        while byte:
+            low = byte & -byte
+            yield (k << 3) + low.bit_length() - 1
+            byte ^= low
+
+
+def bitset_from_indices(indices, size):
+    """Build a bitset with the bits at `indices` set.
+
+    The bits are first collected in a bytearray and converted to an int in
+    one go, as setting them one by one on an int is quadratic in `size`.
+    """
+    buf = bytearray((size + 7) // 8)
+    for index in indices:
+        buf[index >> 3] |= 1 << (index & 7)
+    return _bytes_to_int(buf)
+
+
+class BitsetCounter(object):
+    """A counter for every bit position, stored in bit-sliced form.
+
+    Bit i of the j-th slice is bit j of the count of position i, so a set of
+    positions given as a bitset can be incremented with a few big-int
+    operations instead of a loop over the positions.
+    """
+    def __init__(self):
+        self._slices = []
+
+    def increment(self, bitset):
+        """Add one to the count of every position set in `bitset`."""
+        slices = self._slices
+        carry = bitset
+        j = 0
+        while carry:
+            if j == len(slices):
+                slices.append(0)
+            slices[j], carry = slices[j] ^ carry, slices[j] & carry
+            j += 1
+
+    def equal(self, value, bitset):
+        """Get the positions of `bitset` whose count is `value`."""
+        if value >> len(self._slices):
+            return 0
+        result = bitset
+        for j, bit_slice in enumerate(self._slices):
+            if (value >> j) & 1:
+                result &= bit_slice
+            else:
+                result &= ~bit_slice
+        return result
+
+
+CacheInfo = namedtuple('CacheInfo', ['hits', 'misses', 'maxsize', 'currsize'])
+
+
+class LRUCache(object):
+    """A mapping which holds at most `maxsize` entries.
+
+    When full, the least recently used entry is evicted to make room for a
+    new one. A `maxsize` of None means the cache is unbounded. Lookups are
+    counted as hits or misses, which can be inspected using `info`.
+    """
+    def __init__(self, maxsize=None):
+        self._data = OrderedDict()
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __getitem__(self, key):
+        try:
+            value = self._data.pop(key)
+        except KeyError:
+            self.misses += 1
+            raise
+        self._data[key] = value
+        self.hits += 1
+        return value
+
+    def __setitem__(self, key, value):
+        self._data.pop(key, None)
+        self._data[key] = value
+        self._evict()
+
+    def _evict(self):
+        if self.maxsize is not None:
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def resize(self, maxsize):
+        self.maxsize = maxsize
+        self._evict()
+
+    def items(self):
+        return self._data.items()
+
+    def clear(self):
+        self._data.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def info(self):
+        return CacheInfo(self.hits, self.misses, self.maxsize, len(self._data))
+
+
+class LevelStats(namedtuple('LevelStats',
+                            ['size', 'candidates', 'frequent'])):
+    """Number of candidates and frequent itemsets of `size` items.
+
+    `candidates` is None if the algorithm does not generate candidates.
+    """
+    __slots__ = ()
+
+    @property
+    def pruned(self):
+        if self.candidates is None:
+            return None
+        return self.candidates - self.frequent
+
+
+class LearnStats(object):
+    """Statistics of a run of learning.
+
+    Attributes
+    ----------
+    mining_time : float
+        Seconds spent finding the frequent itemsets, support counting
+        included.
+
+    rule_generation_time : float
+        Seconds spent generating rules from the frequent itemsets.
+
+    prune_rules_time : float
+        Seconds spent pruning rules by database coverage.
+
+    total_time : float
+        Seconds spent learning, or None while learning is in progress.
+
+    peak_rules : int
+        Largest number of rules held at once, before they are pruned.
+
+    cache_info : CacheInfo
+        Hits and misses of the support count cache while learning, or None
+        if the dataset is streamed from a csv file.
+    """
+    def __init__(self):
+        self._candidates = dict()
+        self._frequent = dict()
+        self.mining_time = 0.0
+        self.rule_generation_time = 0.0
+        self.prune_rules_time = 0.0
+        self.total_time = None
+        self.peak_rules = 0
+        self.cache_info = None
+
+    @property
+    def levels(self):
+        """Get the LevelStats of every itemset size, in increasing order.
+
+        When a csv file is streamed, candidates are counted in every chunk.
+        """
+        sizes = sorted(set(self._candidates).union(self._frequent))
+        return [LevelStats(size, self._candidates.get(size),
+                           self._frequent.get(size, 0)) for size in sizes]
+
+    def add_candidates(self, size, count):
+        self._candidates[size] = self._candidates.get(size, 0) + count
+
+    def add_frequent(self, size, count):
+        self._frequent[size] = self._frequent.get(size, 0) + count
@@ -0,0 +1,236 @@
+"""Benchmarks of the mining and classification hot paths.
+
+The suites follow the conventions of airspeed velocity (asv): `setup` is
+run before the `time_*` methods are timed, once for every value of
+`params`. They can also be run without asv::
+
+    python benchmark.py
+"""
+from armine import ARM, ARMClassifier
+import csv
+import itertools
+import os
+import random
+import tempfile
+import timeit
+
+RAW_FILENAME = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                            'sample', 'raw.csv')
+
+
+def generate_transactions(n_rows=2000, avg_width=10, n_items=200,
+                          n_patterns=50, avg_pattern_width=4, seed=0):
+    """Generate synthetic transactions, in the manner of the IBM Quest
+    generator.
+
+    A pool of `n_patterns` itemsets, the potentially frequent patterns, is
+    drawn first, with consecutive patterns sharing some items. Every
+    transaction is then filled with patterns picked according to
+    exponentially distributed weights, until it reaches its width. Widths
+    are drawn around their averages, and the same `seed` always gives the
+    same transactions.
+
+    Parameters
+    ----------
+    n_rows : int
+        Number of transactions(Default 2000).
+
+    avg_width : int
+        Average number of items of a transaction(Default 10).
+
+    n_items : int
+        Number of distinct items(Default 200).
+
+    n_patterns : int
+        Number of patterns(Default 50).
+
+    avg_pattern_width : int
+        Average number of items of a pattern(Default 4).
+
+    seed : int
+        Seed of the random number generator(Default 0).
+
+    Returns
+    -------
+    list of lists
+        The transactions, with items named 'i0' to 'i{n_items - 1}'.
+    """
+    rng = random.Random(seed)
+    items = ['i{}'.format(i) for i in range(n_items)]
+
+    def draw_width(average):
+        return max(1, int(round(rng.gauss(average, average ** 0.5))))
+
+    patterns = []
+    previous = []
+    for _ in range(n_patterns):
+        width = min(draw_width(avg_pattern_width), n_items)
+        shared = previous[:rng.randint(0, min(len(previous), width // 2))]
+        pattern = set(shared)
+        while len(pattern) < width:
+            pattern.add(rng.choice(items))
+        previous = sorted(pattern)
+        rng.shuffle(previous)
+        patterns.append(previous)
+    weights = [rng.expovariate(1) for _ in patterns]
+
+    transactions = []
+    for _ in range(n_rows):
+        width = min(draw_width(avg_width), n_items)
+        transaction = set()
+        while len(transaction) < width:
+            pattern = rng.choices(patterns, weights)[0]
+            # Patterns are corrupted by dropping some of their items.
+            transaction.update(item for item in pattern
+                               if rng.random() > 0.2)
+        transactions.append(sorted(transaction))
+    return transactions
+
+
+def _read_raw():
+    with open(RAW_FILENAME) as csvfile:
+        return [row for row in csv.reader(csvfile)]
+
+
+class LoadFromCSV(object):
+    def setup(self):
+        fd, self.filename = tempfile.mkstemp(suffix='.csv')
+        with os.fdopen(fd, 'w') as csvfile:
+            csv.writer(csvfile).writerows(generate_transactions())
+
+    def teardown(self):
+        os.remove(self.filename)
+
+    def time_arm(self):
+        ARM().load_from_csv(self.filename)
+
+    def time_classifier(self):
+        ARMClassifier().load_from_csv(RAW_FILENAME, -1)
+
+
+class ARMLearn(object):
+    params = ['apriori', 'fpgrowth', 'eclat', 'declat']
+    param_names = ['algorithm']
+    number = 1
+
+    def setup(self, algorithm):
+        self.arm = ARM()
+        self.arm.load(generate_transactions())
+
+    def time_learn(self, algorithm):
+        # Lowering the thresholds forces learning again.
+        self.arm._real_support_threshold = float('inf')
+        self.arm.learn(0.02, 0.5, algorithm=algorithm)
+
+
+class ParallelLearn(object):
+    """Learning with a pool of counting processes, against the serial path
+    of `n_jobs=1`."""
+    params = [['transactions', 'raw.csv'], [1, 2, 4]]
+    param_names = ['dataset', 'n_jobs']
+    number = 1
+    repeat = 3
+
+    def setup(self, dataset, n_jobs):
+        if dataset == 'transactions':
+            self.arm = ARM()
+            self.arm.load(generate_transactions(n_rows=50000))
+            self.thresholds = (0.02, 0.5)
+        else:
+            self.arm = ARMClassifier()
+            self.arm.load_from_csv(RAW_FILENAME, -1)
+            self.thresholds = (0.05, 0.1)
+
+    def time_learn(self, dataset, n_jobs):
+        self.arm._real_support_threshold = float('inf')
+        support_threshold, confidence_threshold = self.thresholds
+        self.arm.learn(support_threshold, confidence_threshold,
+                       n_jobs=n_jobs)
+
+
+class ARMClassifierLearn(object):
+    number = 1
+
+    def setup(self):
+        self.arm = ARMClassifier()
+        self.arm.load_from_csv(RAW_FILENAME, -1)
+
+    def time_learn(self):
+        self.arm._real_support_threshold = float('inf')
+        self.arm.learn(0.05, 0.1)
+
+
+class PruneRules(object):
+    def setup(self):
+        self.arm = ARM()
+        self.arm.load(generate_transactions())
+        self.arm.learn(0.02, 0.5)
+        self.rules = self.arm._rules
+
+    def time_prune_rules(self):
+        self.arm._rules = self.rules[:]
+        self.arm._prune_rules()
+
+
+class Classify(object):
+    def setup(self):
+        self.arm = ARMClassifier()
+        self.arm.load_from_csv(RAW_FILENAME, -1)
+        self.arm.learn(0.05, 0.1)
+        self.instances = [row[:-1] for row in _read_raw()[:1000]]
+        self.arm.classify(self.instances[0])
+
+    def time_classify(self):
+        for instance in self.instances:
+            self.arm.classify(instance)
+
+    def time_classify_many(self):
+        self.arm.classify_many(self.instances)
+
+
+SUITES = [LoadFromCSV, ARMLearn, ParallelLearn, ARMClassifierLearn,
+          PruneRules, Classify]
+
+
+def _get_params(suite):
+    """Get the arguments of every run of `suite`. As in asv, a list of
+    lists of parameters gives every combination of them."""
+    params = getattr(suite, 'params', None)
+    if params is None:
+        return [()]
+    if all(isinstance(param, list) for param in params):
+        return list(itertools.product(*params))
+    return [(param,) for param in params]
+
+
+def run(suite, repeat=5):
+    """Run the benchmarks of `suite`, printing the best time of each."""
+    repeat = getattr(suite, 'repeat', repeat)
+    for args in _get_params(suite):
+        benchmark = suite()
+        benchmark.setup(*args)
+        try:
+            for name in sorted(dir(suite)):
+                if not name.startswith('time_'):
+                    continue
+                method = getattr(benchmark, name)
+                number = getattr(suite, 'number', 10)
+                best = min(timeit.repeat(lambda: method(*args),
+                                         repeat=repeat, number=number))
+                label = '{}.{}'.format(suite.__name__, name)
+                if args:
+                    label += '({})'.format(', '.join(map(str, args)))
+                print('{:<40} {:>10.2f} ms'.format(label,
+                                                  1000 * best / number))
+        finally:
+            if hasattr(benchmark, 'teardown'):
+                benchmark.teardown()
+
+
+def main():
+    for suite in SUITES:
+        run(suite)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,27 @@
-from armine import ARM, ARMClassifier
+from armine import ARM, ARMClassifier, AtomicPredictor
+from armine.matcher import RuleMatcher
+from armine.mining import eclat, fpgrowth
+from armine.rule import AssociationRule
+from armine.ruletable import RuleTable, ThresholdIndex
+from armine.utils import BitsetCounter
+from itertools import combinations
+import os
+import tempfile
 import unittest
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+try:
+    import pandas
+except ImportError:
+    pandas = None
+try:
+    import scipy.sparse
+except ImportError:
+    scipy = None
+
 ARM_TEST_FILENAME = 'sample//arm_sample.csv'
 ARM_TEST_DATA = [['Bread', 'Milk'],
                  ['Bread', 'Diapers', 'Beer', 'Eggs'],
@@ -14,6 +35,14 @@ ARM_CLASSIFIER_TEST_DATA = {('Egg','Chicken'): 'NV',
                             ('Chicken','Milk'): 'M',
                             ('Milk','Spinach'): 'V',}
 
+class SmallBlockThresholdIndex(ThresholdIndex):
+    MIN_BLOCK_SIZE = 2
+
+
+class ArrayRuleTable(RuleTable):
+    _USE_NUMPY = False
+
+
 class ARMTestCase(unittest.TestCase):
     def setUp(self):
         self.arm = ARM()
@@ -111,11 +140,349 @@ class ARMTestCase(unittest.TestCase):
         for rule in rules2:
             self.assertTrue(rule.coverage >= 0.3 and rule.confidence >= 0.2)
 
+    def test_learn_algorithms(self):
+        self.learn(0.2, 0.1, 20)
+        rules = set(self.arm.rules)
+        for algorithm in ('fpgrowth', 'eclat', 'declat'):
+            self.arm.learn(0.2, 0.1, 20, algorithm=algorithm)
+            self.check(0.2, 0.1, 20)
+            self.assertEqual(set(self.arm.rules), rules)
+        # Itemsets which never occur are left out at a support of 0.
+        self.arm.learn(0.0, 0.0, float('inf'))
+        rules = set(self.arm.rules)
+        self.assertTrue(all(rule._count_both > 0 for rule in rules))
+        for algorithm in ('fpgrowth', 'eclat', 'declat'):
+            self.arm.learn(0.0, 0.0, float('inf'), algorithm=algorithm)
+            self.assertEqual(set(self.arm.rules), rules)
+
+    def test_learn_chunked_csv(self):
+        self.arm.load_from_csv(ARM_TEST_FILENAME)
+        self.arm.learn(0.2, 0.1, 1000)
+        rules = set(self.arm.rules)
+        for algorithm in ('apriori', 'fpgrowth', 'eclat'):
+            arm = ARM()
+            arm.load_from_csv(ARM_TEST_FILENAME, chunk_size=2)
+            arm.learn(0.2, 0.1, 1000, algorithm=algorithm)
+            self.assertEqual(set(arm.rules), rules)
+            self.assertEqual(arm._datasize, len(ARM_TEST_DATA))
+            self.assertEqual(arm._dataset, [])
+
+    def test_learn_parallel(self):
+        self.learn(0.2, 0.1, 20)
+        rules = set(self.arm.rules)
+        arm = ARM()
+        arm._PARALLEL_MIN_CANDIDATES = 1
+        arm.load(ARM_TEST_DATA)
+        arm.learn(0.2, 0.1, 20, n_jobs=2)
+        self.assertEqual(set(arm.rules), rules)
+        self.assertTrue(arm._pool is None)
+
+    def test_update(self):
+        for support_threshold in (0.2, 0.4, 0.6):
+            arm = ARM()
+            arm.load(ARM_TEST_DATA[:2])
+            arm.learn(support_threshold, 0.1, 20)
+            arm.update(ARM_TEST_DATA[2:])
+            # The lookups of the counts maintained by the update are
+            # counted.
+            self.assertGreater(arm.learn_stats().cache_info.hits, 0)
+            self.assertEqual(arm.learn_stats().cache_info.hits,
+                             arm.cache_info().hits)
+            self.arm = ARM()
+            self.learn(support_threshold, 0.1, 20)
+            self.assertEqual(set(arm.rules), set(self.arm.rules))
+            self.assertEqual(arm._frequent_itemsets,
+                             self.arm._frequent_itemsets)
+
+    def test_update_chunked_csv(self):
+        self.arm.load_from_csv(ARM_TEST_FILENAME, chunk_size=2)
+        with self.assertRaises(ValueError):
+            self.arm.update(ARM_TEST_DATA)
+
+    def test_update_without_frequent_itemsets(self):
+        self.arm.load(ARM_TEST_DATA)
+        self.arm.learn_top_k(5, 0.5)
+        with self.assertRaises(ValueError):
+            self.arm.update(ARM_TEST_DATA)
+        self.assertEqual(self.arm._datasize, len(ARM_TEST_DATA))
+
+    def test_save_model(self):
+        self.learn(0.2, 0.1, 20)
+        self.arm.learn(0.3, 0.2, 20)
+        fd, filename = tempfile.mkstemp()
+        os.close(fd)
+        try:
+            self.arm.save(filename)
+            arm = ARM()
+            arm.load_model(filename)
+            self.assertEqual(list(arm.rules), self.arm.rules)
+            self.assertEqual(arm.rules[-1], self.arm.rules[-1])
+            self.assertEqual(arm.support_threshold, 0.3)
+            # The counts are read from the arrays of the model.
+            for table_type in (RuleTable, ArrayRuleTable):
+                table = table_type(arm._rules)
+                expected = table_type(list(arm._rules))
+                for name in table.columns:
+                    self.assertEqual(table.column(name),
+                                     expected.column(name))
+            with self.assertRaises(ValueError):
+                arm.update(ARM_TEST_DATA)
+            with self.assertRaises(ValueError):
+                ARMClassifier().load_model(filename)
+        finally:
+            os.remove(filename)
+
+    def test_learn_stats(self):
+        events = []
+        self.arm.set_stats_callback(lambda event, stats: events.append(event))
+        self.learn(0.2, 0.1, 20)
+        stats = self.arm.learn_stats()
+        levels = stats.levels
+        self.assertEqual(events, ['level'] * len(levels) + ['done'])
+        self.assertEqual(levels[0], (1, 6, 6))
+        for level in levels:
+            self.assertEqual(level.pruned, level.candidates - level.frequent)
+        self.assertTrue(stats.peak_rules >= len(self.arm._rules))
+        self.assertTrue(stats.total_time >= stats.prune_rules_time)
+        self.assertEqual(stats.cache_info.misses,
+                         self.arm.cache_info().misses)
+
+    def test_learn_engine_counts(self):
+        self.learn(0.2, 0.1, 20)
+        for algorithm in ('fpgrowth', 'eclat', 'declat'):
+            arm = ARM()
+            arm.load(ARM_TEST_DATA)
+            arm.learn(0.2, 0.1, 20, algorithm=algorithm)
+            # The counts of the mined itemsets are not counted again.
+            self.assertEqual(arm.cache_info().misses, 0)
+            self.assertEqual(set(arm.rules), set(self.arm.rules))
+
+    def test_learn_top_k(self):
+        self.learn(0.01, 0.5, float('inf'))
+        supports = sorted((rule.support for rule in self.arm.rules),
+                          reverse=True)
+        for k in (1, 5, 20):
+            arm = ARM()
+            arm.load(ARM_TEST_DATA)
+            arm.learn_top_k(k, 0.5)
+            self.assertEqual(len(arm.rules), k)
+            self.assertEqual(sorted((rule.support for rule in arm.rules),
+                                    reverse=True), supports[:k])
+            self.assertEqual(arm.support_threshold, supports[k - 1])
+            for rule in arm.rules:
+                self.assertTrue(rule.confidence >= 0.5)
+
+    def test_learn_top_k_parallel(self):
+        self.arm.load(ARM_TEST_DATA)
+        self.arm.learn_top_k(5, 0.5)
+        rules = set(self.arm.rules)
+        arm = ARM()
+        arm._PARALLEL_MIN_CANDIDATES = 1
+        arm.load(ARM_TEST_DATA)
+        arm.learn(0.2, 0.1, 20, n_jobs=2)
+        arm.learn_top_k(5, 0.5, n_jobs=2)
+        self.assertEqual(set(arm.rules), rules)
+        self.assertTrue(arm._pool is None)
+        self.assertEqual(arm._n_jobs, 2)
+        arm.learn_top_k(5, 0.5)
+        self.assertEqual(arm._n_jobs, 1)
+
+    def test_learn_itemsets(self):
+        self.learn(0.2, 0.0, float('inf'))
+        frequent = dict((frozenset(rule.antecedent + rule.consequent),
+                         rule.support) for rule in self.arm.rules)
+        closed = set(itemset for itemset, support in frequent.items()
+                     if not any(itemset < other and support == other_support
+                                for other, other_support in frequent.items()))
+        maximal = set(itemset for itemset in frequent
+                      if not any(itemset < other for other in frequent))
+        for algorithm in ('apriori', 'fpgrowth', 'eclat', 'declat'):
+            for itemsets, expected in (('closed', closed),
+                                       ('maximal', maximal)):
+                self.arm.learn(0.2, 0.0, float('inf'), algorithm=algorithm,
+                               itemsets=itemsets)
+                self.assertEqual(set(frozenset(rule.antecedent
+                                               + rule.consequent)
+                                     for rule in self.arm.rules), expected)
+            self.arm.learn(0.2, 0.0, float('inf'), algorithm=algorithm,
+                           max_length=2)
+            for rule in self.arm.rules:
+                self.assertTrue(len(rule.antecedent + rule.consequent) <= 2)
+        with self.assertRaises(ValueError):
+            self.arm.learn(0.2, 0.0, itemsets='unknown')
+
+    def test_mine_closed_itemsets(self):
+        self.arm.load(ARM_TEST_DATA)
+        tidsets = dict(zip(self.arm._items, self.arm._item_bitsets))
+        for min_count in (1, 2, 3):
+            frequent = dict((frozenset(itemset), count) for itemset, count
+                            in fpgrowth(ARM_TEST_DATA, min_count))
+            closed = dict((itemset, count)
+                          for itemset, count in frequent.items()
+                          if not any(itemset < other and count == other_count
+                                     for other, other_count
+                                     in frequent.items()))
+            maximal = dict((itemset, count)
+                           for itemset, count in frequent.items()
+                           if not any(itemset < other for other in frequent))
+            for itemsets, expected in (('closed', closed),
+                                       ('maximal', maximal)):
+                for mined in (fpgrowth(ARM_TEST_DATA, min_count,
+                                       itemsets=itemsets),
+                              eclat(tidsets, min_count, itemsets=itemsets),
+                              eclat(tidsets, min_count, diffsets=True,
+                                    itemsets=itemsets)):
+                    self.assertEqual(dict((frozenset(itemset), count)
+                                          for itemset, count in mined),
+                                     expected)
+        with self.assertRaises(ValueError):
+            fpgrowth(ARM_TEST_DATA, 1, max_length=2, itemsets='closed')
+
+    def test_generate_rules(self):
+        self.arm.load(ARM_TEST_DATA)
+        self.arm._real_confidence_threshold = 0.6
+        items = self.arm._encode(['Bread', 'Milk', 'Diapers'])
+        self.arm._generate_rules([items])
+        expected = set()
+        for size in (1, 2):
+            for consequent in combinations(items, size):
+                antecedent = tuple(i for i in items if i not in consequent)
+                rule = AssociationRule(
+                    self.arm._decode(antecedent), self.arm._decode(consequent),
+                    2, self.arm._get_count(antecedent),
+                    self.arm._get_count(consequent), len(ARM_TEST_DATA))
+                if rule.confidence >= 0.6:
+                    expected.add(rule)
+        self.assertEqual(set(self.arm._rules), expected)
+        self.assertEqual(len(expected), 3)
+
+    @unittest.skipIf(numpy is None, "numpy is not installed")
+    def test_load_matrix(self):
+        self.learn(0.2, 0.1, 20)
+        rules = set(self.arm.rules)
+        items = sorted(set(item for row in ARM_TEST_DATA for item in row))
+        matrix = numpy.array([[item in row for item in items]
+                              for row in ARM_TEST_DATA])
+        data = [matrix]
+        if scipy is not None:
+            data.append(scipy.sparse.csr_matrix(matrix))
+        for matrix in data:
+            for algorithm in ('apriori', 'fpgrowth'):
+                arm = ARM()
+                arm.load_matrix(matrix, items)
+                arm.learn(0.2, 0.1, 20, algorithm=algorithm)
+                self.assertEqual(set(arm.rules), rules)
+        self.assertEqual(arm._dataset, [list(row) for row in
+                                        map(sorted, ARM_TEST_DATA)])
+
+    def test_learn_unknown_algorithm(self):
+        self.arm.load(ARM_TEST_DATA)
+        with self.assertRaises(ValueError):
+            self.arm.learn(0.2, 0.1, 20, algorithm='unknown')
+
+    def test_rule_table(self):
+        self.learn(0.2, 0.1, 20)
+        table = self.arm.rule_table
+        self.assertEqual(table.tolist(), self.arm.rules)
+
+        view = table.filter(support=0.4, lift=1.1)
+        self.assertEqual(set(view), set(rule for rule in self.arm.rules
+                                        if rule.support >= 0.4
+                                        and rule.lift >= 1.1))
+        self.assertEqual(view.column('support'),
+                         [rule.support for rule in view])
+
+        view = table.sort(('confidence', 'support'))
+        keys = [(rule.confidence, rule.support) for rule in view]
+        self.assertEqual(keys, sorted(keys, reverse=True))
+        self.assertEqual(len(view[:3]), 3)
+
+        top = table.top(2, by='leverage')
+        self.assertEqual([rule.leverage for rule in top],
+                         sorted((rule.leverage for rule in table),
+                                reverse=True)[:2])
+
+    def test_threshold_index(self):
+        self.learn(0.0, 0.0, 1000)
+        table = self.arm.rule_table
+        index = SmallBlockThresholdIndex(table, 'support', 'confidence')
+        for support in (None, 0.0, 0.2, 0.4, 0.7):
+            for confidence in (None, 0.3, 0.5, 1.0):
+                expected = table.filter(support=support,
+                                        confidence=confidence)
+                self.assertEqual(index.query(support, confidence).tolist(),
+                                 expected.tolist())
+
+    def test_rule_table_columns(self):
+        # The NumPy and array columns give the same views.
+        self.learn(0.0, 0.0, 1000)
+        tables = [RuleTable(self.arm._rules), ArrayRuleTable(self.arm._rules)]
+        views = []
+        for table in tables:
+            index = SmallBlockThresholdIndex(table, 'support', 'confidence')
+            views.append([
+                table.filter(support=0.4, lift=1.1).tolist(),
+                table.sort(('confidence', 'support')).tolist(),
+                table.sort('lift', reverse=False)[2:9].tolist(),
+                table.top(5, by='leverage').tolist(),
+                table.top(5, by='support', reverse=False).tolist(),
+                table.filter(lift=1.0).sort('confidence').column('lift'),
+                index.query(0.2, 0.5).tolist(),
+                index.query(None, 0.3).tolist(),
+            ])
+        self.assertEqual(views[0], views[1])
+
     def test_initial_itemset(self):
         expected = ['Beer', 'Bread', 'Cola', 'Diapers', 'Milk']
         itemset = self.arm._get_initial_itemset()
         self.compare_iterable(itemset, expected)
 
+    def test_rule_metrics(self):
+        rule = AssociationRule(('Beer',), ('Diapers',), 3, 3, 4, 5)
+        self.assertFalse(hasattr(rule, '__dict__'))
+        self.assertEqual(rule.support, 0.6)
+        self.assertEqual(rule.coverage, 0.6)
+        self.assertEqual(rule.confidence, 1)
+        self.assertEqual(rule.lift, 1.25)
+        self.assertEqual(rule.leverage, 3)
+        self.assertEqual(rule.conviction, 1)
+        self.assertTrue(rule.match_antecedent(['Diapers', 'Beer']))
+        self.assertFalse(rule.match_antecedent(['Diapers']))
+
+        rule = AssociationRule(('Beer',), ('Diapers',), 0, 0, 0, 5)
+        self.assertEqual((rule.confidence, rule.lift), (0, 1))
+
+    def test_bitset_counter(self):
+        counter = BitsetCounter()
+        for bitset in (0b0111, 0b0110, 0b0100, 0b1100):
+            counter.increment(bitset)
+        self.assertEqual(counter.equal(4, 0b1111), 0b0100)
+        self.assertEqual(counter.equal(3, 0b1111), 0)
+        self.assertEqual(counter.equal(2, 0b1111), 0b0010)
+        self.assertEqual(counter.equal(1, 0b1011), 0b1001)
+        self.assertEqual(counter.equal(8, 0b1111), 0)
+
+    def test_prune_rules(self):
+        self.arm.load(ARM_TEST_DATA)
+        self.arm._real_coverage_threshold = 2
+        self.arm._rules = [AssociationRule(antecedent, ('Cola',),
+                                           1, 1, 1, 5)
+                           for antecedent in [('Bread',), ('Milk',),
+                                              ('Bread', 'Milk'),
+                                              ('Diapers',)]]
+        self.arm._prune_rules()
+        # Bread and Milk cover the rows containing both twice, leaving no
+        # row for the third rule.
+        self.assertEqual([rule.antecedent for rule in self.arm._rules],
+                         [('Bread',), ('Milk',), ('Diapers',)])
+
+    def test_nextgen_itemset(self):
+        self.arm.load(ARM_TEST_DATA)
+        itemset = [(0, 1), (0, 2), (0, 3), (1, 2), (1, 3)]
+        # (0, 2, 3) is dropped as (2, 3) is not in the level.
+        self.assertEqual(self.arm._get_nextgen_itemset(itemset),
+                         [(0, 1, 2), (0, 1, 3)])
+
     def test_itemcount(self):
         self.arm.load(ARM_TEST_DATA)
         count = self.arm._get_itemcount(['Beer'])
@@ -127,6 +494,36 @@ class ARMTestCase(unittest.TestCase):
         count = self.arm._get_itemcount(['Beer', 'Bread', 'Cola'])
         self.assertEqual(count, 0)
 
+    def test_item_bitsets(self):
+        self.arm.load(ARM_TEST_DATA)
+        encode = self.arm._encode
+        self.assertEqual(self.arm._get_bitset(encode(['Beer'])), 0b01110)
+        self.assertEqual(self.arm._get_bitset(encode(['Beer', 'Bread'])),
+                         0b01010)
+        self.assertEqual(self.arm._get_bitset(()), 0b11111)
+        self.assertRaises(KeyError, encode, ['Butter'])
+
+    def test_item_encoding(self):
+        self.arm.load(ARM_TEST_DATA)
+        ids = self.arm._encode(['Milk', 'Beer', 'Beer'])
+        self.assertEqual(ids, (0, 5))
+        self.assertEqual(self.arm._decode(ids), ('Beer', 'Milk'))
+        self.assertEqual(self.arm._get_counts([(0,), (0, 2), (0, 5), (1,)]),
+                         [3, 1, 2, 4])
+
+    def test_itemcount_cache(self):
+        self.arm.load(ARM_TEST_DATA)
+        self.arm.set_cache_size(2)
+        self.arm._get_itemcount(['Beer', 'Bread'])
+        self.arm._get_itemcount(['Bread', 'Beer'])
+        self.arm._get_itemcount(['Milk'])
+        self.arm._get_itemcount(['Cola'])
+        info = self.arm.cache_info()
+        self.assertEqual((info.hits, info.misses), (1, 3))
+        self.assertEqual((info.maxsize, info.currsize), (2, 2))
+        self.assertFalse(self.arm._encode(['Beer', 'Bread'])
+                         in self.arm._itemcounts)
+
 class ARMClassifierTestCase(unittest.TestCase):
     def setUp(self):
         self.arm = ARMClassifier()
@@ -184,12 +581,246 @@ class ARMClassifierTestCase(unittest.TestCase):
         self.arm.learn(support_threshold, confidence_threshold,
                        coverage_threshold)
 
+    def test_learn_chunked_csv(self):
+        self.arm.load_from_csv(ARM_CLASSIFIER_TEST_FILENAME, -1, True)
+        self.arm.learn(0.2, 0.1, 1000)
+        rules = set(self.arm.rules)
+        arm = ARMClassifier()
+        arm.load_from_csv(ARM_CLASSIFIER_TEST_FILENAME, -1, True,
+                          chunk_size=3)
+        arm.learn(0.2, 0.1, 1000)
+        self.assertEqual(set(arm.rules), rules)
+        self.assertEqual(arm._default_class, self.arm._default_class)
+
+    def test_classwise_count_parallel(self):
+        self.arm.load(ARM_CLASSIFIER_TEST_DATA, True)
+        self.arm._n_jobs = 2
+        self.arm._PARALLEL_MIN_CANDIDATES = 1
+        itemset = [self.arm._encode(['Milk']),
+                   self.arm._encode(['Milk', 'Spinach'])]
+        counts = self.arm._get_counts(itemset)
+        self.arm._close_pool()
+        self.compare_classwise_counts(counts[0], {'V': [1, 1],
+                                                  'NV': [0, 1],
+                                                  'M': [2, 2]})
+        self.compare_classwise_counts(counts[1], {'V': [1, 1],
+                                                  'NV': [0, 1],
+                                                  'M': [1, 2]})
+
+    def test_rule_matcher(self):
+        rules = [AssociationRule(antecedent, ('X',), 1, 1, 1, 1)
+                 for antecedent in [('a', 'b'), ('c',), (), ('a',), ('b',)]]
+        matcher = RuleMatcher(rules)
+        self.assertEqual(matcher.match_ids(['b', 'a', 'a']), [0, 2, 3, 4])
+        self.assertEqual(matcher.match_ids(['a', 'b'], 2), [0, 2])
+        self.assertEqual(matcher.match_ids(['c'], 0), [])
+        self.assertEqual(matcher.match(['d']), [rules[2]])
+
+    def test_classify(self):
+        self.learn(0.2, 0.1, 20)
+        for features, label in ARM_CLASSIFIER_TEST_DATA.items():
+            matching_rules = [rule for rule in self.arm.rules
+                              if rule.match_antecedent(features)][:2]
+            self.assertEqual(self.arm._get_matcher().match(features, 2),
+                             matching_rules)
+            self.assertTrue(self.arm.classify(features, 2)
+                            in self.arm._classes)
+
+    def test_classify_many(self):
+        self.learn(0.2, 0.1, 20)
+        features = list(ARM_CLASSIFIER_TEST_DATA) + [(), ('Tofu',)]
+        for top_k_rules in (None, 0, 1, 2, 25):
+            self.assertEqual(self.arm.classify_many(features, top_k_rules),
+                             [self.arm.classify(instance, top_k_rules)
+                              for instance in features])
+
+    def test_match_bitsets(self):
+        rules = [AssociationRule(antecedent, ('X',), 1, 1, 1, 1)
+                 for antecedent in [('a', 'b'), ('c',), (), ('a',), ('b',)]]
+        matcher = RuleMatcher(rules)
+        rows = [['b', 'a', 'a'], ['c'], ['d']]
+        item_bitsets = {'a': 0b001, 'b': 0b001, 'c': 0b010, 'd': 0b100}
+        self.assertEqual(list(matcher.match_bitsets(item_bitsets, 3)),
+                         [(0, 0b001), (1, 0b010), (2, 0b111), (3, 0b001),
+                          (4, 0b001)])
+        self.assertEqual(list(matcher.match_bitsets(item_bitsets, 3, 2)),
+                         [(0, 0b001), (1, 0b010), (2, 0b111)])
+        for top_k in (1, 2, 3):
+            matches = matcher.match_bitsets(item_bitsets, 3, top_k)
+            ids = [[] for _ in rows]
+            for rule_id, bitset in matches:
+                for row in range(len(rows)):
+                    if bitset >> row & 1:
+                        ids[row].append(rule_id)
+            self.assertEqual(ids, [matcher.match_ids(row, top_k)
+                                   for row in rows])
+
+    @unittest.skipIf(numpy is None, "numpy is not installed")
+    def test_predict(self):
+        self.learn(0.2, 0.1, 20)
+        features = list(ARM_CLASSIFIER_TEST_DATA) + [()]
+        labels = [self.arm.classify(instance, 2) for instance in features]
+        self.assertEqual(list(self.arm.predict(features, 2)), labels)
+
+        items = sorted(set(item for instance in features
+                           for item in instance))
+        matrix = numpy.array([[item in instance for item in items]
+                              for instance in features])
+        predicted, scores, classes = self.arm.predict(
+            matrix, 2, items=items, return_scores=True)
+        self.assertEqual(list(predicted), labels)
+        self.assertEqual(scores.shape, (len(features), len(classes)))
+        for instance, row in zip(features, scores):
+            expected = dict()
+            for rule in self.arm._get_matcher().match(instance, 2):
+                expected[rule.consequent] = (expected.get(rule.consequent, 0)
+                                             + rule.lift)
+            self.assertEqual(dict((label, score) for label, score
+                                  in zip(classes, row) if score),
+                             expected)
+
+    def test_predictor(self):
+        self.learn(0.2, 0.1, 20)
+        predictor = self.arm.predictor()
+        self.assertIs(self.arm.predictor(), predictor)
+        self.assertRaises(AttributeError, setattr, predictor,
+                          '_default_class', None)
+        features = list(ARM_CLASSIFIER_TEST_DATA)
+        labels = [self.arm.classify(instance, 2) for instance in features]
+        self.assertEqual(predictor.classify_many(features, 2), labels)
+
+        # Learning again leaves the predictor as it was.
+        self.arm.learn(0.5, 0.9, 20)
+        self.assertIsNot(self.arm.predictor(), predictor)
+        self.assertEqual(predictor.classify_many(features, 2), labels)
+
+        shared = AtomicPredictor(predictor)
+        self.assertIs(shared.swap(self.arm.predictor()), predictor)
+        self.assertIs(shared.get(), self.arm.predictor())
+        try:
+            import asyncio
+        except ImportError:
+            return
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            future = shared.classify_async(features, 2)
+            self.assertEqual(loop.run_until_complete(future),
+                             [self.arm.classify(instance, 2)
+                              for instance in features])
+        finally:
+            asyncio.set_event_loop(None)
+            loop.close()
+
     def test_learn(self):
         self.learn(0.2, 0.1, 20)
         self.assertTrue(self.arm._default_class in self.arm._classes)
         for rule in self.arm._rules:
             self.assertTrue(rule.consequent in self.arm._classes)
 
+    def test_update(self):
+        data = list(ARM_CLASSIFIER_TEST_DATA.items())
+        self.arm.load(dict(data[:2]), True)
+        self.arm.learn(0.2, 0.1, 20)
+        self.arm.update(dict(data[2:]))
+        arm = ARMClassifier()
+        arm.load(ARM_CLASSIFIER_TEST_DATA, True)
+        arm.learn(0.2, 0.1, 20)
+        self.assertEqual(set(self.arm.rules), set(arm.rules))
+        self.assertEqual(self.arm._default_class, arm._default_class)
+        self.assertEqual(self.arm._frequent_itemsets, arm._frequent_itemsets)
+
+    def test_update_apparent_thresholds(self):
+        data = list(ARM_CLASSIFIER_TEST_DATA.items())
+        self.arm.load(dict(data[:2]), True)
+        self.arm.learn(0.2, 0.1, 20)
+        self.arm.learn(0.5, 1.0, 20)
+        self.arm.update(dict(data[2:]))
+        arm = ARMClassifier()
+        arm.load(ARM_CLASSIFIER_TEST_DATA, True)
+        arm.learn(0.2, 0.1, 20)
+        # The default class is found with the rules learned, whichever
+        # thresholds they are viewed at.
+        self.assertEqual(self.arm._default_class, arm._default_class)
+        arm.learn(0.5, 1.0, 20)
+        self.assertEqual(set(self.arm.rules), set(arm.rules))
+
+    def test_save_model(self):
+        self.learn(0.2, 0.1, 20)
+        fd, filename = tempfile.mkstemp()
+        os.close(fd)
+        try:
+            self.arm.save(filename)
+            arm = ARMClassifier()
+            arm.load_model(filename)
+            self.assertEqual(list(arm.rules), self.arm.rules)
+            self.assertEqual(arm._default_class, self.arm._default_class)
+            for features in ARM_CLASSIFIER_TEST_DATA:
+                self.assertEqual(arm._get_matcher().match(features, 2),
+                                 self.arm._get_matcher().match(features, 2))
+                self.assertEqual(arm.classify(features, 2),
+                                 self.arm.classify(features, 2))
+        finally:
+            os.remove(filename)
+
+    def test_save_model_labels(self):
+        data = [(features, label) for (features, _), label
+                in zip(ARM_CLASSIFIER_TEST_DATA.items(), [0, 1, 1, 2.5])]
+        self.arm.load(data, True)
+        self.arm.learn(0.2, 0.1, 20)
+        fd, filename = tempfile.mkstemp()
+        os.close(fd)
+        try:
+            self.arm.save(filename)
+            arm = ARMClassifier()
+            arm.load_model(filename)
+            self.assertEqual(list(arm.rules), self.arm.rules)
+            self.assertEqual(set(type(rule.consequent) for rule in arm.rules),
+                             set([int, float]))
+            self.assertEqual(arm._default_class, self.arm._default_class)
+            for features, _ in data:
+                self.assertEqual(arm.classify(features),
+                                 self.arm.classify(features))
+        finally:
+            os.remove(filename)
+
+    def test_load_pairs(self):
+        data = list(ARM_CLASSIFIER_TEST_DATA.items()) * 2
+        self.arm.load(data, True)
+        self.assertEqual(self.arm._datasize, len(data))
+
+    @unittest.skipIf(pandas is None, "pandas is not installed")
+    def test_load_dataframe(self):
+        data = [(('a', 'x'), 'P'), (('a', 'y'), 'P'), (('b', 'x'), 'N'),
+                (('a', 'x'), 'P')]
+        self.arm.load(data)
+        self.arm.learn(0.2, 0.1, 20)
+        arm = ARMClassifier()
+        arm.load_dataframe(pandas.DataFrame([row for row, _ in data]),
+                           [label for _, label in data])
+        arm.learn(0.2, 0.1, 20)
+        self.assertEqual(set(arm.rules), set(self.arm.rules))
+        self.assertEqual(arm._default_class, self.arm._default_class)
+
+    def test_load_numeric_dataframe(self):
+        rows = [(1, -2.5), (1, 0.5), (2, -2.5), (1, -2.5), (2, 0.5), (3, 0.5)]
+        labels = [True, True, False, True, False, False]
+        frame = pandas.DataFrame(rows)
+        self.arm.load_dataframe(frame, labels)
+        self.arm.learn(0.1, 0.6, 20)
+        self.assertIn((-2.5,), [rule.antecedent for rule in self.arm.rules])
+        instances = frame.values.tolist()
+        expected = [self.arm.classify(row) for row in instances]
+        self.assertEqual(expected, labels)
+        self.assertEqual(self.arm.classify_many(instances), labels)
+        self.assertEqual(list(self.arm.predict(frame)), labels)
+        self.assertEqual(list(self.arm.predict(frame.values)), labels)
+
+        arm = ARMClassifier()
+        arm.load(list(zip(rows, labels)))
+        arm.learn(0.1, 0.6, 20)
+        self.assertEqual(set(arm.rules), set(self.arm.rules))
+
 def test_arm():
     ar = ARM()
     ar.load(data1)